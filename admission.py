@@ -0,0 +1,119 @@
+# admission.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+def _as_datetime(value):
+    # SQLite hands timestamps back as text, PostgreSQL as datetime
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def exam_window(exam, now=None):
+    """Return 'upcoming', 'open' or 'closed' for an exam's scheduled window.
+
+    Exams without ``starts_at``/``ends_at`` are always open.
+    """
+    now = now or datetime.now()
+    starts_at = _as_datetime(exam['starts_at'])
+    ends_at = _as_datetime(exam['ends_at'])
+    if starts_at and now < starts_at:
+        return 'upcoming'
+    if ends_at and now >= ends_at:
+        return 'closed'
+    return 'open'
+
+
+class AdmissionController:
+    """Caps how many students may start an exam at the same moment.
+
+    Admitting a student takes one of ``capacity`` slots until ``release``
+    is called once their exam page is built.  ``lease`` seconds is only a
+    timeout for slots never released because the request crashed.  Once
+    all slots are taken, later students wait in a first-come,
+    first-served queue and are admitted in order as slots free up.
+    Waiting pages poll, and a queued student who stops polling for
+    ``queue_timeout`` seconds loses their place so they cannot hold up
+    everyone behind them.
+
+    State is per process; with several workers each enforces its own
+    share of the capacity.
+    """
+
+    def __init__(self, capacity, lease=10.0, queue_timeout=30.0, clock=time.monotonic):
+        self.capacity = capacity
+        self.lease = lease
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self._leases = {}
+        self._queue = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, user_id):
+        """Return 0 if ``user_id`` may start now, else their 1-based queue position."""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            if user_id in self._leases:
+                return 0
+
+            # Re-polling keeps the original place in the queue
+            self._queue[user_id] = now
+            free = self.capacity - len(self._leases)
+            for position, queued in enumerate(self._queue, start=1):
+                if queued == user_id:
+                    break
+            if position <= free:
+                del self._queue[user_id]
+                self._leases[user_id] = now + self.lease
+                return 0
+            return position
+
+    def release(self, user_id):
+        """Free the slot taken by ``admit`` for ``user_id``."""
+        with self._lock:
+            self._leases.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            self._expire(self.clock())
+            return {'starting': len(self._leases), 'waiting': len(self._queue), 'capacity': self.capacity}
+
+    def _expire(self, now):
+        for user_id in [u for u, expires in self._leases.items() if expires <= now]:
+            del self._leases[user_id]
+        for user_id in [u for u, seen in self._queue.items() if now - seen > self.queue_timeout]:
+            del self._queue[user_id]
+
+
+class ExamPrewarmer(threading.Thread):
+    """Loads exams into the ExamCache shortly before their window opens.
+
+    Every ``interval`` seconds, exams whose ``starts_at`` falls within the
+    next ``lead`` seconds are warmed, so the first students through the
+    door hit memory instead of the database.
+    """
+
+    def __init__(self, db, exam_cache, lead=300, interval=30):
+        super().__init__(name='exam-prewarmer', daemon=True)
+        self.db = db
+        self.exam_cache = exam_cache
+        self.lead = lead
+        self.interval = interval
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            self.warm_upcoming()
+            self._stopping.wait(self.interval)
+
+    def warm_upcoming(self, now=None):
+        now = now or datetime.now()
+        exams = self.db.exams_opening_between(now, now + timedelta(seconds=self.lead))
+        return [exam['id'] for exam in exams if self.exam_cache.warm(exam['id'])]
@@ -1,99 +1,81 @@
 # app.py
-from flask import Flask, render_template, request, redirect, url_for, flash, session, abort
-import sqlite3
+from flask import Flask, render_template, request, redirect, url_for, flash, session, abort, make_response, jsonify
 import os
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
+from storage import get_storage, IntegrityError
+from purge import PurgeWorker
+import assets
+from cache import cached_page, page_cache, ExamCache
+from admission import AdmissionController, ExamPrewarmer, exam_window
+from bundles import BundleError, BundleSignatureError, issue_token, load_bundle
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+# Set SECRET_KEY so sessions and answer bundles survive restarts and work across workers
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
+
+# Fingerprinted, pre-compressed static files (see build_assets.py)
+assets.init_app(app)
 
 # Database setup
+db = get_storage()
+
 def init_db():
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        role TEXT DEFAULT 'student'
-    )
-    ''')
-    
-    # Create exams table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS exams (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT,
-        time_limit INTEGER DEFAULT 30
-    )
-    ''')
-    
-    # Create questions table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS questions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        exam_id INTEGER,
-        question_text TEXT NOT NULL,
-        option_a TEXT NOT NULL,
-        option_b TEXT NOT NULL,
-        option_c TEXT NOT NULL,
-        option_d TEXT NOT NULL,
-        correct_answer TEXT NOT NULL,
-        FOREIGN KEY (exam_id) REFERENCES exams (id)
-    )
-    ''')
-    
-    # Create results table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS results (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        exam_id INTEGER,
-        score INTEGER,
-        total_questions INTEGER,
-        date_taken TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id),
-        FOREIGN KEY (exam_id) REFERENCES exams (id)
-    )
-    ''')
+    db.init_schema()
     
     # Insert sample data
     # Add default admin users
-    cursor.execute('INSERT OR IGNORE INTO users (username, password, email, role) VALUES (?, ?, ?, ?)',
-                  ('admin', generate_password_hash('admin123'), 'admin@example.com', 'admin'))
-    cursor.execute('INSERT OR IGNORE INTO users (username, password, email, role) VALUES (?, ?, ?, ?)',
-                  ('superadmin', generate_password_hash('super123'), 'superadmin@example.com', 'admin'))
-    
-    # Add a sample exam
-    cursor.execute('INSERT OR IGNORE INTO exams (id, title, description, time_limit) VALUES (?, ?, ?, ?)',
-                  (1, 'Python Basics', 'Test your knowledge of Python fundamentals', 10))
-    
-    # Add sample questions
-    sample_questions = [
-        (1, 'What is Python?', 'A snake', 'A programming language', 'A game', 'A food', 'B'),
-        (1, 'Which of the following is not a Python data type?', 'List', 'Dictionary', 'Tuple', 'Array', 'D'),
-        (1, 'What is the output of print(2 + 2)?', '4', '22', 'Error', 'None', 'A'),
-        (1, 'Which of these is used to define a function in Python?', 'function', 'def', 'define', 'func', 'B'),
-        (1, 'What symbol is used for comments in Python?', '//', '#', '--', '/*', 'B')
-    ]
-    
-    for q in sample_questions:
-        cursor.execute('INSERT OR IGNORE INTO questions (exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer) VALUES (?, ?, ?, ?, ?, ?, ?)', q)
-    
-    conn.commit()
-    conn.close()
+    for username, password, email in [('admin', 'admin123', 'admin@example.com'),
+                                      ('superadmin', 'super123', 'superadmin@example.com')]:
+        if not db.get_user_by_username(username):
+            db.create_user(username, generate_password_hash(password), email, 'admin')
+    
+    # Add a sample exam with sample questions
+    if db.count_exams() == 0:
+        exam_id = db.create_exam('Python Basics', 'Test your knowledge of Python fundamentals', 10)
+        
+        sample_questions = [
+            ('What is Python?', 'A snake', 'A programming language', 'A game', 'A food', 'B'),
+            ('Which of the following is not a Python data type?', 'List', 'Dictionary', 'Tuple', 'Array', 'D'),
+            ('What is the output of print(2 + 2)?', '4', '22', 'Error', 'None', 'A'),
+            ('Which of these is used to define a function in Python?', 'function', 'def', 'define', 'func', 'B'),
+            ('What symbol is used for comments in Python?', '//', '#', '--', '/*', 'B')
+        ]
+        
+        for q in sample_questions:
+            db.add_question(exam_id, *q)
 
 # Initialize database
 init_db()
 
+# Deleted exams and students are purged in the background
+purge_worker = PurgeWorker(db)
+purge_worker.start()
+
+# Exam rows, questions and answer keys are served from memory
+exam_cache = ExamCache(db, max_age=float(os.environ.get('EXAM_CACHE_MAX_AGE', 1.0)))
+
+# Students queue once more than ADMISSION_CAPACITY are starting exams at once
+admission = AdmissionController(int(os.environ.get('ADMISSION_CAPACITY', 50)),
+                                lease=float(os.environ.get('ADMISSION_LEASE', 10)))
+
+# Scheduled exams are loaded into exam_cache before their window opens
+prewarmer = ExamPrewarmer(db, exam_cache, lead=int(os.environ.get('PREWARM_LEAD', 300)))
+prewarmer.start()
+
+# Seconds between refreshes of the waiting page
+QUEUE_POLL_SECONDS = 5
+
+# How long after the time limit an offline answer bundle is still accepted
+BUNDLE_GRACE_SECONDS = int(os.environ.get('BUNDLE_GRACE_SECONDS', 600))
+
+def form_datetime(name):
+    # <input type="datetime-local"> posts '2025-06-01T09:00', or '' when left blank
+    value = request.form.get(name)
+    return datetime.fromisoformat(value) if value else None
+
 # Admin required decorator
 def admin_required(f):
     @wraps(f)
@@ -119,19 +101,12 @@ def register():
         password = request.form['password']
         email = request.form['email']
         
-        conn = sqlite3.connect('exam_system.db')
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
-                          (username, generate_password_hash(password), email))
-            conn.commit()
+            db.create_user(username, generate_password_hash(password), email)
             flash('Registration successful! You can now log in.', 'success')
             return redirect(url_for('login'))
-        except sqlite3.IntegrityError:
+        except IntegrityError:
             flash('Username or email already exists!', 'error')
-        finally:
-            conn.close()
             
     return render_template('register.html')
 
@@ -141,21 +116,16 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        conn = sqlite3.connect('exam_system.db')
-        cursor = conn.cursor()
+        user = db.get_user_by_username(username)
         
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        user = cursor.fetchone()
-        conn.close()
-        
-        if user and check_password_hash(user[2], password):
-            session['user_id'] = user[0]
-            session['username'] = user[1]
-            session['role'] = user[4]
+        if user and check_password_hash(user['password'], password):
+            session['user_id'] = user['id']
+            session['username'] = user['username']
+            session['role'] = user['role']
             flash('Login successful!', 'success')
             
             # Redirect based on role
-            if user[4] == 'admin':
+            if user['role'] == 'admin':
                 return redirect(url_for('admin_dashboard'))
             else:
                 return redirect(url_for('dashboard'))
@@ -171,29 +141,17 @@ def logout():
     return redirect(url_for('index'))
 
 @app.route('/dashboard')
+@cached_page(db.user_data_version)
 def dashboard():
     if 'user_id' not in session:
         flash('Please login first!', 'error')
         return redirect(url_for('login'))
     
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
     # Get available exams
-    cursor.execute('SELECT * FROM exams')
-    exams = cursor.fetchall()
+    exams = db.list_exams()
     
     # Get user's results
-    cursor.execute('''
-    SELECT r.id, e.title, r.score, r.total_questions, r.date_taken
-    FROM results r
-    JOIN exams e ON r.exam_id = e.id
-    WHERE r.user_id = ?
-    ORDER BY r.date_taken DESC
-    ''', (session['user_id'],))
-    results = cursor.fetchall()
-    
-    conn.close()
+    results = db.user_results(session['user_id'])
     
     return render_template('dashboard.html', exams=exams, results=results)
 
@@ -203,31 +161,62 @@ def take_exam(exam_id):
         flash('Please login first!', 'error')
         return redirect(url_for('login'))
     
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
     # Get exam details
-    cursor.execute('SELECT * FROM exams WHERE id = ?', (exam_id,))
-    exam = cursor.fetchone()
+    exam = exam_cache.exam(exam_id)
     
     if not exam:
         flash('Exam not found!', 'error')
         return redirect(url_for('dashboard'))
     
-    # Get exam questions
-    cursor.execute('SELECT * FROM questions WHERE exam_id = ?', (exam_id,))
-    questions = cursor.fetchall()
-    
-    conn.close()
-    
-    # Shuffle questions
-    random.shuffle(questions)
-    
-    # Store exam time limit in session
-    session['exam_time'] = exam[3] * 60  # convert minutes to seconds
-    session['exam_id'] = exam_id
+    # Only within the scheduled window
+    window = exam_window(exam)
+    if window == 'upcoming':
+        flash(f"This exam opens at {exam['starts_at']}.", 'info')
+        return redirect(url_for('dashboard'))
+    elif window == 'closed':
+        flash('This exam has closed.', 'error')
+        return redirect(url_for('dashboard'))
     
-    return render_template('exam.html', exam=exam, questions=questions)
+    # A reload keeps the open attempt, so the answers saved for it are restored
+    attempt = None
+    if session.get('exam_id') == exam_id and session.get('attempt_id'):
+        attempt = db.get_attempt(session['attempt_id'])
+        if attempt and (attempt['user_id'] != session['user_id'] or attempt['submitted_at'] is not None):
+            attempt = None
+    
+    # Queue the student if too many are starting right now; reloading an
+    # exam already under way never queues
+    admitted = attempt is None
+    if admitted:
+        position = admission.admit(session['user_id'])
+        if position:
+            response = make_response(render_template('waiting.html', exam=exam, position=position,
+                                                     poll_seconds=QUEUE_POLL_SECONDS))
+            response.headers['Retry-After'] = str(QUEUE_POLL_SECONDS)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+    
+    try:
+        # Get exam questions
+        questions = exam_cache.questions(exam_id)
+        
+        # Shuffle questions
+        random.shuffle(questions)
+        
+        # Store exam time limit and attempt in session
+        session['exam_time'] = exam['time_limit'] * 60  # convert minutes to seconds
+        session['exam_id'] = exam_id
+        if attempt is None:
+            session['attempt_id'] = db.start_attempt(session['user_id'], exam_id)
+        
+        # Lets the page submit a signed answer bundle instead of the form
+        bundle_token = issue_token(app.secret_key, session['attempt_id'], session['user_id'], exam_id)
+        
+        return render_template('exam.html', exam=exam, questions=questions, bundle_token=bundle_token)
+    finally:
+        # The slot only covers building the exam page
+        if admitted:
+            admission.release(session['user_id'])
 
 @app.route('/submit_exam', methods=['POST'])
 def submit_exam():
@@ -235,58 +224,100 @@ def submit_exam():
         flash('Invalid session!', 'error')
         return redirect(url_for('dashboard'))
     
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
+    if not exam_cache.exam(session['exam_id']):
+        flash('Exam not found!', 'error')
+        return redirect(url_for('dashboard'))
     
     # Get all questions for the exam
-    cursor.execute('SELECT id, correct_answer FROM questions WHERE exam_id = ?', (session['exam_id'],))
-    questions = cursor.fetchall()
+    questions = exam_cache.answer_key(session['exam_id'])
     
     score = 0
     total_questions = len(questions)
     
     # Calculate score
     for question in questions:
-        q_id = question[0]
-        correct_answer = question[1]
-        user_answer = request.form.get(f'question_{q_id}', '')
+        user_answer = request.form.get(f"question_{question['id']}", '')
         
-        if user_answer == correct_answer:
+        if user_answer == question['correct_answer']:
             score += 1
     
     # Save result
-    cursor.execute('''
-    INSERT INTO results (user_id, exam_id, score, total_questions, date_taken)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (session['user_id'], session['exam_id'], score, total_questions, datetime.now()))
-    
-    conn.commit()
-    conn.close()
+    result_id = db.record_result(session['user_id'], session['exam_id'], score, total_questions)
+    if session.get('attempt_id'):
+        db.finish_attempt(session.pop('attempt_id'), result_id)
+    page_cache.invalidate_user(session['user_id'])
     
     percentage = (score / total_questions) * 100 if total_questions > 0 else 0
     
     flash(f'Exam submitted! Your score: {score}/{total_questions} ({percentage:.1f}%)', 'success')
     return redirect(url_for('dashboard'))
 
+@app.route('/submit_bundle', methods=['POST'])
+def submit_bundle():
+    # Answer bundle from the offline-capable exam page (see static/script.js).
+    # 403 keeps the bundle on the device for a later page load, other 4xx
+    # responses are final; the client retries network errors and 5xx.
+    try:
+        claims, _, answers = load_bundle(app.secret_key, request.get_data(),
+                                                 request.headers.get('Content-Encoding'))
+    except BundleSignatureError as e:
+        return jsonify(error=str(e)), 403
+    except BundleError as e:
+        return jsonify(error=str(e)), 400
+    
+    if 'user_id' in session and session['user_id'] != claims['user']:
+        return jsonify(error='This exam belongs to another user'), 403
+    
+    exam = exam_cache.exam(claims['exam'])
+    if not exam:
+        return jsonify(error='Exam not found'), 404
+    
+    attempt = db.get_attempt(claims['attempt'])
+    if attempt is None:
+        return jsonify(error='This exam was already submitted or is no longer available'), 409
+    
+    # Reloading the exam page issues a new token, so time the attempt itself
+    started_at = attempt['started_at']
+    if isinstance(started_at, str):
+        started_at = datetime.fromisoformat(started_at)
+    deadline = started_at + timedelta(minutes=exam['time_limit'], seconds=BUNDLE_GRACE_SECONDS)
+    if datetime.now() > deadline:
+        return jsonify(error='The time limit for this exam has passed'), 400
+    
+    # Grade everything in memory, then store it in one batch
+    answer_key = exam_cache.answer_key(claims['exam'])
+    graded = [(q['id'], answers.get(q['id']), answers.get(q['id']) == q['correct_answer']) for q in answer_key]
+    score = sum(1 for _, _, correct in graded if correct)
+    total_questions = len(graded)
+    
+    result_id, stored = db.record_answer_bundle(claims['attempt'], score, total_questions, graded)
+    if stored:
+        page_cache.invalidate_user(claims['user'])
+    else:
+        # Re-sent bundle: report the result stored the first time
+        result = db.get_result(result_id) if result_id else None
+        if result is None:
+            return jsonify(error='This exam was already submitted or is no longer available'), 409
+        score, total_questions = result['score'], result['total_questions']
+    
+    # A bundle for an earlier attempt must not end the exam open in this session
+    if session.get('attempt_id') == claims['attempt']:
+        session.pop('attempt_id')
+        session.pop('exam_id', None)
+    
+    percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+    
+    flash(f'Exam submitted! Your score: {score}/{total_questions} ({percentage:.1f}%)', 'success')
+    return jsonify(score=score, total_questions=total_questions, redirect=url_for('dashboard'))
+
 @app.route('/results')
+@cached_page(db.user_data_version)
 def view_results():
     if 'user_id' not in session:
         flash('Please login first!', 'error')
         return redirect(url_for('login'))
     
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    SELECT r.id, e.title, r.score, r.total_questions, r.date_taken
-    FROM results r
-    JOIN exams e ON r.exam_id = e.id
-    WHERE r.user_id = ?
-    ORDER BY r.date_taken DESC
-    ''', (session['user_id'],))
-    results = cursor.fetchall()
-    
-    conn.close()
+    results = db.user_results(session['user_id'])
     
     return render_template('results.html', results=results)
 
@@ -294,55 +325,18 @@ def view_results():
 @app.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    # Get total number of users
-    cursor.execute('SELECT COUNT(*) FROM users WHERE role = "student"')
-    total_students = cursor.fetchone()[0]
-    
-    # Get total number of exams
-    cursor.execute('SELECT COUNT(*) FROM exams')
-    total_exams = cursor.fetchone()[0]
-    
-    # Get total number of questions
-    cursor.execute('SELECT COUNT(*) FROM questions')
-    total_questions = cursor.fetchone()[0]
-    
-    # Get total number of results/attempts
-    cursor.execute('SELECT COUNT(*) FROM results')
-    total_attempts = cursor.fetchone()[0]
-    
-    # Get recent exam results
-    cursor.execute('''
-    SELECT u.username, e.title, r.score, r.total_questions, r.date_taken
-    FROM results r
-    JOIN users u ON r.user_id = u.id
-    JOIN exams e ON r.exam_id = e.id
-    ORDER BY r.date_taken DESC
-    LIMIT 10
-    ''')
-    recent_results = cursor.fetchall()
-    
-    conn.close()
-    
     return render_template('admin/dashboard.html', 
-                          total_students=total_students,
-                          total_exams=total_exams,
-                          total_questions=total_questions,
-                          total_attempts=total_attempts,
-                          recent_results=recent_results)
+                          total_students=db.count_users_by_role('student'),
+                          total_exams=db.count_exams(),
+                          total_questions=db.count_questions(),
+                          total_attempts=db.count_results() + db.count_archived_results(),
+                          recent_results=db.recent_results(10),
+                          purge_jobs=db.list_purge_jobs(10))
 
 @app.route('/admin/exams')
 @admin_required
 def admin_exams():
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM exams')
-    exams = cursor.fetchall()
-    
-    conn.close()
+    exams = db.list_exams()
     
     return render_template('admin/exams.html', exams=exams)
 
@@ -353,72 +347,60 @@ def admin_add_exam():
         title = request.form['title']
         description = request.form['description']
         time_limit = request.form['time_limit']
+        starts_at = form_datetime('starts_at')
+        ends_at = form_datetime('ends_at')
         
-        conn = sqlite3.connect('exam_system.db')
-        cursor = conn.cursor()
+        if starts_at and ends_at and ends_at <= starts_at:
+            flash('The exam must close after it opens!', 'error')
+            return render_template('admin/add_edit_exam.html', exam=None)
         
-        cursor.execute('INSERT INTO exams (title, description, time_limit) VALUES (?, ?, ?)',
-                      (title, description, time_limit))
-        exam_id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
+        exam_id = db.create_exam(title, description, time_limit, starts_at, ends_at)
+        page_cache.clear()
         
         flash('Exam added successfully!', 'success')
         return redirect(url_for('admin_edit_exam', exam_id=exam_id))
         
-    return render_template('admin/add_exam.html')
+    return render_template('admin/add_edit_exam.html', exam=None)
 
 @app.route('/admin/exams/edit/<int:exam_id>', methods=['GET', 'POST'])
 @admin_required
 def admin_edit_exam(exam_id):
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
     if request.method == 'POST':
         title = request.form['title']
         description = request.form['description']
         time_limit = request.form['time_limit']
+        starts_at = form_datetime('starts_at')
+        ends_at = form_datetime('ends_at')
         
-        cursor.execute('UPDATE exams SET title = ?, description = ?, time_limit = ? WHERE id = ?',
-                     (title, description, time_limit, exam_id))
-        conn.commit()
-        
-        flash('Exam updated successfully!', 'success')
+        if starts_at and ends_at and ends_at <= starts_at:
+            flash('The exam must close after it opens!', 'error')
+        else:
+            db.update_exam(exam_id, title, description, time_limit, starts_at, ends_at)
+            exam_cache.invalidate(exam_id)
+            page_cache.clear()
+            
+            flash('Exam updated successfully!', 'success')
     
     # Get exam details
-    cursor.execute('SELECT * FROM exams WHERE id = ?', (exam_id,))
-    exam = cursor.fetchone()
-    
-    # Get exam questions
-    cursor.execute('SELECT * FROM questions WHERE exam_id = ?', (exam_id,))
-    questions = cursor.fetchall()
-    
-    conn.close()
+    exam = db.get_exam(exam_id)
     
     if not exam:
         flash('Exam not found!', 'error')
         return redirect(url_for('admin_exams'))
+    
+    # Get exam questions
+    questions = db.list_questions(exam_id)
         
-    return render_template('admin/edit_exam.html', exam=exam, questions=questions)
+    return render_template('admin/add_edit_exam.html', exam=exam, questions=questions)
 
 @app.route('/admin/exams/delete/<int:exam_id>')
 @admin_required
 def admin_delete_exam(exam_id):
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    # Delete associated questions
-    cursor.execute('DELETE FROM questions WHERE exam_id = ?', (exam_id,))
-    
-    # Delete associated results
-    cursor.execute('DELETE FROM results WHERE exam_id = ?', (exam_id,))
-    
-    # Delete the exam
-    cursor.execute('DELETE FROM exams WHERE id = ?', (exam_id,))
-    
-    conn.commit()
-    conn.close()
+    # Hide the exam now; its questions, results and attempts are purged in the background
+    if db.soft_delete_exam(exam_id):
+        purge_worker.wake()
+        exam_cache.invalidate(exam_id)
+        page_cache.clear()
     
     flash('Exam deleted successfully!', 'success')
     return redirect(url_for('admin_exams'))
@@ -433,16 +415,8 @@ def admin_add_question(exam_id):
     option_d = request.form['option_d']
     correct_answer = request.form['correct_answer']
     
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO questions (exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer))
-    
-    conn.commit()
-    conn.close()
+    db.add_question(exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer)
+    exam_cache.invalidate(exam_id)
     
     flash('Question added successfully!', 'success')
     return redirect(url_for('admin_edit_exam', exam_id=exam_id))
@@ -450,55 +424,34 @@ def admin_add_question(exam_id):
 @app.route('/admin/questions/delete/<int:question_id>')
 @admin_required
 def admin_delete_question(question_id):
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
     # Get the exam_id before deleting
-    cursor.execute('SELECT exam_id FROM questions WHERE id = ?', (question_id,))
-    result = cursor.fetchone()
+    question = db.get_question(question_id)
     
-    if not result:
+    if not question:
         flash('Question not found!', 'error')
         return redirect(url_for('admin_exams'))
-        
-    exam_id = result[0]
     
     # Delete the question
-    cursor.execute('DELETE FROM questions WHERE id = ?', (question_id,))
-    
-    conn.commit()
-    conn.close()
+    db.delete_question(question_id)
+    exam_cache.invalidate(question['exam_id'])
     
     flash('Question deleted successfully!', 'success')
-    return redirect(url_for('admin_edit_exam', exam_id=exam_id))
+    return redirect(url_for('admin_edit_exam', exam_id=question['exam_id']))
 
 @app.route('/admin/students')
 @admin_required
 def admin_students():
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM users WHERE role = "student"')
-    students = cursor.fetchall()
-    
-    conn.close()
+    students = db.list_users_by_role('student')
     
     return render_template('admin/students.html', students=students)
 
 @app.route('/admin/students/delete/<int:student_id>')
 @admin_required
 def admin_delete_student(student_id):
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    # Delete associated results
-    cursor.execute('DELETE FROM results WHERE user_id = ?', (student_id,))
-    
-    # Delete the student
-    cursor.execute('DELETE FROM users WHERE id = ? AND role = "student"', (student_id,))
-    
-    conn.commit()
-    conn.close()
+    # Hide the student now; their results and attempts are purged in the background
+    if db.soft_delete_student(student_id):
+        purge_worker.wake()
+        page_cache.invalidate_user(student_id)
     
     flash('Student deleted successfully!', 'success')
     return redirect(url_for('admin_students'))
@@ -506,32 +459,19 @@ def admin_delete_student(student_id):
 @app.route('/admin/results')
 @admin_required
 def admin_results():
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
+    # Archived results are only searched when asked for
+    include_archived = request.args.get('include_archived') == '1'
+    results = db.all_results(include_archived=include_archived)
     
-    cursor.execute('''
-    SELECT r.id, u.username, e.title, r.score, r.total_questions, r.date_taken
-    FROM results r
-    JOIN users u ON r.user_id = u.id
-    JOIN exams e ON r.exam_id = e.id
-    ORDER BY r.date_taken DESC
-    ''')
-    results = cursor.fetchall()
-    
-    conn.close()
-    
-    return render_template('admin/results.html', results=results)
+    return render_template('admin/results.html', results=results, include_archived=include_archived)
 
 @app.route('/admin/results/delete/<int:result_id>')
 @admin_required
 def admin_delete_result(result_id):
-    conn = sqlite3.connect('exam_system.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('DELETE FROM results WHERE id = ?', (result_id,))
-    
-    conn.commit()
-    conn.close()
+    result = db.get_result(result_id)
+    if result:
+        db.delete_result(result_id)
+        page_cache.invalidate_user(result['user_id'])
     
     flash('Result deleted successfully!', 'success')
     return redirect(url_for('admin_results'))
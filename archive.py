@@ -0,0 +1,84 @@
+# archive.py
+"""Move old exam results out of the hot ``results`` table.
+
+Results taken more than ``ARCHIVE_AFTER_DAYS`` days ago (default 365) are
+copied to the archive (an attached ``*_archive.db`` file on SQLite, the
+``archive`` schema on PostgreSQL), folded into ``result_summaries`` so
+attempt counts stay correct, and deleted from ``results``.  Run it from
+cron or by hand:
+
+    python archive.py --older-than-days 180
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from storage import get_storage
+
+
+def archive_results(db, older_than_days, batch_size=1000, pause=0.05):
+    """Archive results older than ``older_than_days``; returns rows moved."""
+    before = datetime.now() - timedelta(days=older_than_days)
+    moved = 0
+    while True:
+        count = db.archive_results_batch(before, batch_size)
+        if not count:
+            return moved
+        moved += count
+        # Let requests take the write lock between batches
+        time.sleep(pause)
+
+
+def _timed(fn, repeat=5):
+    # Best of ``repeat`` runs, in milliseconds
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def hot_table_stats(db):
+    """Row count, size and latency of the queries behind the result pages."""
+    return {
+        'rows': db.count_results(),
+        'bytes': db.table_size('results'),
+        'count_ms': _timed(db.count_results),
+        'recent_ms': _timed(lambda: db.recent_results(10)),
+        'listing_ms': _timed(db.all_results),
+    }
+
+
+def print_stats(before, after):
+    print(f"{'':<22}{'before':>14}{'after':>14}")
+    labels = [('rows', 'hot rows'), ('bytes', 'hot table bytes'), ('count_ms', 'COUNT(*) ms'),
+              ('recent_ms', 'recent results ms'), ('listing_ms', 'admin listing ms')]
+    for key, label in labels:
+        values = [stats[key] for stats in (before, after)]
+        cells = ''.join(f'{v:>14.2f}' if isinstance(v, float) else f'{"n/a" if v is None else v:>14}'
+                        for v in values)
+        print(f'{label:<22}{cells}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old exam results.')
+    parser.add_argument('--older-than-days', type=int, default=int(os.environ.get('ARCHIVE_AFTER_DAYS', 365)))
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--database', help='defaults to DATABASE_URL')
+    args = parser.parse_args()
+
+    db = get_storage(args.database)
+    db.init_schema()
+    before = hot_table_stats(db)
+    moved = archive_results(db, args.older_than_days, args.batch_size)
+    after = hot_table_stats(db)
+    print(f'Archived {moved} results older than {args.older_than_days} days.')
+    print_stats(before, after)
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# assets.py
+import json
+import os
+
+from flask import request, send_from_directory
+
+# Fingerprinted files never change, so browsers may keep them for a year
+# without revalidating
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Content-Encoding -> suffix written by build_assets.py, in preference order
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def init_app(app):
+    """Serve the output of build_assets.py when a manifest is present.
+
+    ``url_for('static', filename='styles.css')`` is rewritten to the
+    fingerprinted ``dist/`` copy, which is sent pre-compressed when the
+    client accepts it and marked immutable.  Without a manifest the
+    original files are served exactly as before.
+    """
+    manifest_path = os.path.join(app.static_folder, 'dist', 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    # Pages that embed asset URLs change whenever the build does
+    app.config['ASSETS_VERSION'] = sorted(manifest.values())
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        if not filename.startswith('dist/'):
+            return app.send_static_file(filename)
+
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.exists(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix,
+                                               mimetype=_mimetype(filename))
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename)
+        # send_from_directory already sets an ETag and answers
+        # If-None-Match/If-Modified-Since with 304
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+
+def _mimetype(filename):
+    return {'.css': 'text/css', '.js': 'text/javascript'}.get(os.path.splitext(filename)[1])
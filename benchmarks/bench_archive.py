@@ -0,0 +1,63 @@
+# benchmarks/bench_archive.py
+"""Hot-table size and query latency before and after archiving.
+
+Seeds a throwaway database with several years of results (spread evenly
+over ``--years``), archives everything older than ``--older-than-days``
+and prints the hot ``results`` table's row count, size and the latency of
+the dashboard/admin queries before and after.
+
+    python benchmarks/bench_archive.py --results 200000
+    python benchmarks/bench_archive.py --postgres postgresql://user:pw@localhost/exam_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import archive_results, hot_table_stats, print_stats
+from storage import SQLiteStorage, PostgresStorage
+
+
+def seed(db, results, years, students=200):
+    db.init_schema()
+    exam_ids = [db.create_exam(f'Bench {i}', 'Benchmark exam', 10) for i in range(5)]
+    user_ids = [db.create_user(f'archive{i}', 'x', f'archive{i}@example.com') for i in range(students)]
+    now = datetime.now()
+    step = timedelta(days=365 * years) / results
+    with db._transaction() as tx:
+        for i in range(results):
+            tx('bench_seed_result', '''
+            INSERT INTO results (user_id, exam_id, score, total_questions, date_taken) VALUES (?, ?, ?, ?, ?)
+            ''', (user_ids[i % students], exam_ids[i % len(exam_ids)], i % 11, 10, now - step * i))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--postgres', default=os.environ.get('BENCH_POSTGRES_URL'))
+    parser.add_argument('--results', type=int, default=100000)
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--older-than-days', type=int, default=365)
+    args = parser.parse_args()
+
+    if args.postgres:
+        db = PostgresStorage(args.postgres)
+    else:
+        db = SQLiteStorage(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    seed(db, args.results, args.years)
+    total_before = db.count_results()
+    before = hot_table_stats(db)
+    moved = archive_results(db, args.older_than_days, batch_size=5000, pause=0)
+    after = hot_table_stats(db)
+    print(f'Archived {moved} of {args.results} results older than {args.older_than_days} days.')
+    print_stats(before, after)
+    total_after = db.count_results() + db.count_archived_results()
+    print(f'attempt total (hot + summaries): {total_before} -> {total_after}')
+    print(f'admin listing with archive: {len(db.all_results(include_archived=True))} rows')
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_storage.py
+"""Backend-neutral storage benchmark.
+
+Runs the same submit/refresh mix (one record_result for every few
+user_results reads) against each configured backend at increasing thread
+counts and prints the throughput of successful operations, so the
+concurrency at which the server database overtakes SQLite's single writer
+can be read off the table.
+
+    python benchmarks/bench_storage.py
+    python benchmarks/bench_storage.py --postgres postgresql://user:pw@localhost/exam_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStorage, PostgresStorage
+
+
+def seed(db, students):
+    db.init_schema()
+    exam_id = db.create_exam('Bench', 'Benchmark exam', 10)
+    for i in range(10):
+        db.add_question(exam_id, f'Question {i}', 'a', 'b', 'c', 'd', 'A')
+    user_ids = [db.create_user(f'bench{i}_{time.time_ns()}', 'x', f'bench{i}_{time.time_ns()}@example.com')
+                for i in range(students)]
+    return exam_id, user_ids
+
+
+def worker(db, exam_id, user_id, ops, reads_per_write, completed, errors):
+    for i in range(ops):
+        try:
+            if i % (reads_per_write + 1) == 0:
+                db.answer_key(exam_id)
+                db.record_result(user_id, exam_id, i % 10, 10)
+            else:
+                db.user_results(user_id)
+        except Exception:
+            errors.append(1)
+        else:
+            completed.append(1)
+
+
+def run(db, exam_id, user_ids, threads, ops, reads_per_write):
+    completed, errors = [], []
+    pool = [threading.Thread(target=worker,
+                             args=(db, exam_id, user_ids[i % len(user_ids)], ops, reads_per_write,
+                                   completed, errors))
+            for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    # Failed operations (e.g. "database is locked") do not count as throughput
+    return len(completed) / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--postgres', default=os.environ.get('BENCH_POSTGRES_URL'),
+                        help='PostgreSQL DSN; omit to benchmark SQLite only')
+    parser.add_argument('--threads', default='1,2,4,8,16,32')
+    parser.add_argument('--ops', type=int, default=200, help='operations per thread')
+    parser.add_argument('--reads-per-write', type=int, default=3)
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.threads.split(',')]
+    backends = [('sqlite', SQLiteStorage(os.path.join(tempfile.mkdtemp(), 'bench.db')))]
+    if args.postgres:
+        backends.append(('postgres', PostgresStorage(args.postgres, maxconn=max(levels))))
+
+    table = {}
+    for name, db in backends:
+        exam_id, user_ids = seed(db, students=max(levels))
+        for threads in levels:
+            table[name, threads] = run(db, exam_id, user_ids, threads, args.ops, args.reads_per_write)
+        db.close()
+
+    names = [name for name, _ in backends]
+    print('threads  ' + '  '.join(f'{n + " ops/s":>16} {"errors":>6}' for n in names))
+    crossover = None
+    for threads in levels:
+        row = [table[n, threads] for n in names]
+        print(f'{threads:>7}  ' + '  '.join(f'{rate:>16.0f} {errs:>6}' for rate, errs in row))
+        if crossover is None and len(row) == 2 and row[1][0] > row[0][0]:
+            crossover = threads
+    if len(names) == 2:
+        print(f'postgres overtakes sqlite at: {crossover or "not reached"} threads')
+
+
+if __name__ == '__main__':
+    main()
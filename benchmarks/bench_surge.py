@@ -0,0 +1,120 @@
+# benchmarks/bench_surge.py
+"""Simulate a scheduled sitting where every student starts at once.
+
+``--students`` threads, each with its own logged-in test client, hit
+/exam/<id> together at the window's opening and keep polling while
+queued.  Each scenario reports how long students waited for admission,
+how many requests the surge cost, the most exam pages being built at
+once, and how many times the question rows were read from the
+database.
+
+    python benchmarks/bench_surge.py --students 300 --capacity 25
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', os.path.join(tempfile.mkdtemp(), 'surge.db'))
+
+import app as exam_app
+from admission import AdmissionController
+from cache import ExamCache
+
+
+def setup(students):
+    db = exam_app.db
+    exam_id = db.create_exam('Surge', 'Scheduled sitting', 30)
+    for i in range(40):
+        db.add_question(exam_id, f'Question {i}', 'a', 'b', 'c', 'd', 'A')
+    user_ids = [db.create_user(f'surge{i}', 'x', f'surge{i}@example.com') for i in range(students)]
+    return exam_id, user_ids
+
+
+def student(user_id, exam_id, poll, barrier, waits, requests):
+    client = exam_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = f'surge{user_id}'
+        sess['role'] = 'student'
+    barrier.wait()
+    start = time.perf_counter()
+    count = 0
+    while True:
+        count += 1
+        response = client.get(f'/exam/{exam_id}')
+        if b'exam-form' in response.data:
+            break
+        time.sleep(poll)
+    waits.append(time.perf_counter() - start)
+    requests.append(count)
+
+
+def scenario(name, exam_id, user_ids, capacity, lease, poll, prewarm):
+    exam_app.exam_cache = ExamCache(exam_app.db)
+    exam_app.admission = AdmissionController(capacity, lease=lease, queue_timeout=60)
+    if prewarm:
+        exam_app.exam_cache.warm(exam_id)
+
+    # Count question reads and exam starts in progress
+    loads = []
+    list_questions = exam_app.db.list_questions
+    exam_app.db.list_questions = lambda *a: loads.append(1) or list_questions(*a)
+    starting = [0, 0]
+    lock = threading.Lock()
+    admit, release = exam_app.admission.admit, exam_app.admission.release
+    def counting_admit(user_id):
+        position = admit(user_id)
+        if not position:
+            with lock:
+                starting[0] += 1
+                starting[1] = max(starting)
+        return position
+    def counting_release(user_id):
+        with lock:
+            starting[0] -= 1
+        release(user_id)
+    exam_app.admission.admit = counting_admit
+    exam_app.admission.release = counting_release
+
+    waits, requests = [], []
+    barrier = threading.Barrier(len(user_ids))
+    threads = [threading.Thread(target=student, args=(u, exam_id, poll, barrier, waits, requests))
+               for u in user_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    exam_app.db.list_questions = list_questions
+
+    peak = starting[1]
+    waits.sort()
+    print(f'{name:<24}{statistics.median(waits):>10.3f}{waits[int(len(waits) * 0.95) - 1]:>10.3f}'
+          f'{waits[-1]:>10.3f}{sum(requests):>10}{peak:>12}{len(loads):>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--capacity', type=int, default=20)
+    parser.add_argument('--lease', type=float, default=10.0, help='seconds before an unreleased slot is freed')
+    parser.add_argument('--poll', type=float, default=0.05, help='seconds between waiting-page refreshes')
+    args = parser.parse_args()
+
+    exam_id, user_ids = setup(args.students)
+    print(f'{args.students} students, capacity {args.capacity}')
+    print(f"{'scenario':<24}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'requests':>10}"
+          f"{'peak starts':>12}{'q loads':>10}")
+    scenario('no admission, cold', exam_id, user_ids, args.students, args.lease, args.poll, prewarm=False)
+    scenario('admission, cold', exam_id, user_ids, args.capacity, args.lease, args.poll, prewarm=False)
+    scenario('admission, pre-warmed', exam_id, user_ids, args.capacity, args.lease, args.poll, prewarm=True)
+    exam_app.purge_worker.stop()
+    exam_app.prewarmer.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# build_assets.py
+"""Build fingerprinted, minified and pre-compressed static assets.
+
+For every CSS/JS file in ``static/`` this writes ``static/dist/<name>.<hash>.<ext>``
+plus ``.gz`` and (when the ``brotli`` package is installed) ``.br`` copies,
+and a ``static/dist/manifest.json`` mapping the original name to the built
+one.  assets.py reads the manifest so ``url_for('static', ...)`` in the
+templates points at the fingerprinted file.
+
+    python build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT_DIR, 'static')
+
+# Pages a student loads in one exam session: log in, dashboard, exam, and
+# back to the dashboard with their score
+SESSION_PAGES = ['login.html', 'dashboard.html', 'exam.html', 'dashboard.html']
+
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    # Only after a colon: the space in ".a :hover" is a descendant combinator
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    # Conservative: drop comments and indentation but keep line breaks so
+    # automatic semicolon insertion behaves exactly as before
+    source = re.sub(r'^\s*/\*.*?\*/', '', source, flags=re.S | re.M)
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(static_dir=STATIC_DIR):
+    dist_dir = os.path.join(static_dir, 'dist')
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    report = []
+    for filename in sorted(os.listdir(static_dir)):
+        base, ext = os.path.splitext(filename)
+        if ext not in MINIFIERS:
+            continue
+        with open(os.path.join(static_dir, filename), encoding='utf-8') as f:
+            original = f.read()
+        minified = MINIFIERS[ext](original).encode('utf-8')
+        digest = hashlib.sha256(minified).hexdigest()[:12]
+        built = f'{base}.{digest}{ext}'
+        path = os.path.join(dist_dir, built)
+
+        with open(path, 'wb') as f:
+            f.write(minified)
+        gzipped = gzip.compress(minified, compresslevel=9, mtime=0)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzipped)
+        sizes = [len(original.encode('utf-8')), len(minified), len(gzipped)]
+        if brotli is not None:
+            compressed = brotli.compress(minified, quality=11)
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+            sizes.append(len(compressed))
+
+        manifest[filename] = f'dist/{built}'
+        report.append((filename, sizes))
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return report
+
+
+def page_assets(template, templates_dir=os.path.join(ROOT_DIR, 'templates')):
+    """Static files a rendered page loads, following {% extends %}."""
+    with open(os.path.join(templates_dir, template), encoding='utf-8') as f:
+        source = f.read()
+    assets = re.findall(r"url_for\('static',\s*filename='([^']+)'\)", source)
+    parent = re.search(r"{%\s*extends\s+'([^']+)'\s*%}", source)
+    if parent:
+        assets = page_assets(parent.group(1), templates_dir) + assets
+    return assets
+
+
+def session_requests(pages=SESSION_PAGES):
+    """Static requests for one exam session, before and after fingerprinting.
+
+    Returns ``(before, cold, warm)``.  Before, every page revalidates each
+    asset it loads.  After, immutable assets are fetched once per browser
+    (cold) and not at all once cached (warm).
+    """
+    loads = [asset for page in pages for asset in page_assets(page)]
+    return len(loads), len(set(loads)), 0
+
+
+def main():
+    report = build()
+    print(f"{'asset':<14}{'original':>10}{'minified':>10}{'gzip':>10}{'brotli':>10}")
+    totals = [0, 0, 0, 0]
+    for filename, sizes in report:
+        for i, size in enumerate(sizes):
+            totals[i] += size
+        print(f'{filename:<14}' + ''.join(f'{size:>10}' for size in sizes))
+    if brotli is None:
+        totals.pop()
+    print(f"{'total':<14}" + ''.join(f'{size:>10}' for size in totals))
+    before, cold, warm = session_requests()
+    print(f'Static requests per exam session ({len(SESSION_PAGES)} pages): '
+          f'{before} before, {cold} on a cold cache, {warm} once cached')
+    print(f"Wrote {os.path.join(STATIC_DIR, 'dist', 'manifest.json')}")
+
+
+if __name__ == '__main__':
+    main()
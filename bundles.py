@@ -0,0 +1,60 @@
+# bundles.py
+import json
+import zlib
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Decompressed bundles larger than this are rejected
+MAX_BUNDLE_BYTES = 256 * 1024
+
+
+class BundleError(Exception):
+    """Raised for an answer bundle that cannot be trusted or decoded."""
+
+
+class BundleSignatureError(BundleError):
+    """Raised when a bundle's token was not signed with this secret key."""
+
+
+def _serializer(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt='exam-answer-bundle')
+
+
+def issue_token(secret_key, attempt_id, user_id, exam_id):
+    """Sign the attempt a bundle may be submitted for.
+
+    The token is embedded in the exam page and must come back inside the
+    bundle, so a bundle is tied to one attempt of one student and cannot
+    be replayed against another exam or account.
+    """
+    return _serializer(secret_key).dumps({'attempt': attempt_id, 'user': user_id, 'exam': exam_id})
+
+
+def load_bundle(secret_key, body, content_encoding):
+    """Decode and verify an answer bundle posted by the exam client.
+
+    ``body`` is JSON ``{"t": token, "a": {question_id: "A"|"B"|"C"|"D"}}``,
+    gzip-compressed when ``content_encoding`` is ``gzip``.  Returns
+    ``(claims, issued_at, answers)`` with answers keyed by integer
+    question id; the caller decides how old ``issued_at`` may be.
+    """
+    if content_encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_BUNDLE_BYTES)
+        except zlib.error as e:
+            raise BundleError('Corrupt bundle') from e
+        if decompressor.unconsumed_tail:
+            raise BundleError('Bundle too large')
+    elif len(body) > MAX_BUNDLE_BYTES:
+        raise BundleError('Bundle too large')
+
+    try:
+        bundle = json.loads(body)
+        claims, issued_at = _serializer(secret_key).loads(bundle['t'], return_timestamp=True)
+        answers = {int(q): str(a) for q, a in bundle['a'].items()}
+    except BadSignature as e:
+        raise BundleSignatureError('Invalid bundle signature') from e
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise BundleError('Malformed bundle') from e
+    return claims, issued_at, answers
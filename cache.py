@@ -0,0 +1,165 @@
+# cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+
+class PageCache:
+    """In-memory LRU of rendered pages, bounded by total body size.
+
+    Entries are keyed by ``(endpoint, user_id)`` and hold the ETag they
+    were rendered for, so a page is only reused while the user's data
+    version is unchanged.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, etag, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (etag, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == user_id]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class ExamCache:
+    """Exam rows, questions and answer keys held in memory per exam.
+
+    Every student starting or submitting an exam reads the same rows, so
+    they are loaded once (one loader at a time, so a start-time surge does
+    not stampede the database).  An entry older than ``max_age`` seconds is
+    checked against the exam's ``updated_at``/``deleted_at`` before it is
+    used again, so edits and deletions made through another worker are
+    picked up within ``max_age``; ``invalidate`` drops it at once in the
+    worker that made the edit.
+    """
+
+    def __init__(self, db, max_age=1.0, clock=time.monotonic):
+        self.db = db
+        self.max_age = max_age
+        self.clock = clock
+        self._exams = {}
+        self._lock = threading.Lock()
+
+    def _load(self, exam_id):
+        entry = self._exams.get(exam_id)
+        if entry is None or self.clock() - entry[3] >= self.max_age:
+            with self._lock:
+                entry = self._exams.get(exam_id)
+                if entry is not None and self.clock() - entry[3] >= self.max_age:
+                    entry = self._revalidate(exam_id, entry)
+                if entry is None:
+                    exam = self.db.get_exam(exam_id)
+                    if exam is None:
+                        return None
+                    entry = (exam, tuple(self.db.list_questions(exam_id)), tuple(self.db.answer_key(exam_id)),
+                             self.clock())
+                    self._exams[exam_id] = entry
+        return entry
+
+    def _revalidate(self, exam_id, entry):
+        # Keep the entry only if the exam is unchanged and not deleted
+        version = self.db.exam_version(exam_id)
+        if version is None or version['deleted_at'] is not None or version['updated_at'] != entry[0]['updated_at']:
+            self._exams.pop(exam_id, None)
+            return None
+        entry = entry[:3] + (self.clock(),)
+        self._exams[exam_id] = entry
+        return entry
+
+    def warm(self, exam_id):
+        return self._load(exam_id) is not None
+
+    def exam(self, exam_id):
+        entry = self._load(exam_id)
+        return entry[0] if entry else None
+
+    def questions(self, exam_id):
+        # A fresh list each call, since take_exam shuffles it
+        entry = self._load(exam_id)
+        return list(entry[1]) if entry else []
+
+    def answer_key(self, exam_id):
+        entry = self._load(exam_id)
+        return entry[2] if entry else ()
+
+    def invalidate(self, exam_id):
+        self._exams.pop(exam_id, None)
+
+
+page_cache = PageCache(int(os.environ.get('PAGE_CACHE_BYTES', 32 * 1024 * 1024)))
+
+
+def cached_page(version):
+    """Serve a per-user page with an ETag derived from ``version(user_id)``.
+
+    A matching If-None-Match gets 304 Not Modified without rendering;
+    otherwise the rendered page is reused from ``page_cache`` while the
+    version is unchanged.  Pages with pending flash messages are always
+    rendered fresh, since those are shown once.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('user_id')
+            if user_id is None or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            fingerprint = repr((request.endpoint, user_id, version(user_id),
+                                current_app.config.get('ASSETS_VERSION')))
+            etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                key = (request.endpoint, user_id)
+                body = page_cache.get(key, etag)
+                if body is None:
+                    rendered = view(*args, **kwargs)
+                    if not isinstance(rendered, str):
+                        return rendered
+                    body = rendered.encode('utf-8')
+                    page_cache.put(key, etag, body)
+                response = make_response(body)
+            response.set_etag(etag)
+            # Browsers must revalidate, and shared caches must not store
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,65 @@
+# purge.py
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeWorker(threading.Thread):
+    """Background thread that hard-deletes soft-deleted exams and students.
+
+    Each job is removed in batches of ``batch_size`` rows, one short
+    transaction per batch, sleeping ``pause`` seconds in between so request
+    handlers can take the write lock.  Progress is stored on the job row,
+    which the admin dashboard displays.
+
+    Every batch renews the worker's claim on its job.  A job whose claim
+    has not been renewed for ``stale_after`` seconds belonged to a worker
+    that died, and is picked up by the next worker to poll.  Errors such
+    as a locked database or a dropped connection are logged and leave the
+    job claimed, so it is retried the same way once the claim goes stale.
+    """
+
+    def __init__(self, db, batch_size=None, pause=None, poll_interval=5.0, stale_after=None):
+        super().__init__(name='purge-worker', daemon=True)
+        self.db = db
+        self.batch_size = batch_size or int(os.environ.get('PURGE_BATCH_SIZE', 500))
+        self.pause = pause if pause is not None else float(os.environ.get('PURGE_PAUSE', 0.05))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after or float(os.environ.get('PURGE_STALE_SECONDS', 60))
+        self.owner = uuid.uuid4().hex
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.db.claim_purge_job(self.owner, self.stale_after)
+            except Exception:
+                logger.exception('Could not claim a purge job')
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self.purge(job)
+
+    def purge(self, job):
+        done = False
+        while not done and not self._stopping.is_set():
+            try:
+                _, done = self.db.purge_batch(job, self.batch_size, self.owner)
+            except Exception:
+                logger.exception('Purge job %s interrupted; retrying once its claim is stale', job['id'])
+                return
+            # Yield the write lock to requests between batches
+            self._stopping.wait(self.pause)
@@ -1,5 +1,150 @@
 /* script.js */
 document.addEventListener('DOMContentLoaded', function() {
+    // Offline-tolerant exam submission.
+    // Answers are kept in localStorage as they are picked, and submitting
+    // queues one signed, gzip-compressed answer bundle that is retried with
+    // backoff until the server accepts it, even from a later page load.
+    const examForm = document.getElementById('exam-form');
+    let bundleStatus = document.getElementById('bundle-status');
+    const PENDING_KEY = 'pending-answer-bundles';
+    let retryDelay = 1000;
+    let retryTimer = null;
+    let submitExam = examForm ? () => examForm.submit() : null;
+
+    function showStatus(text) {
+        if (!bundleStatus) {
+            // Pages without an exam form report queued bundles as a flash message
+            bundleStatus = document.createElement('div');
+            bundleStatus.className = 'flash-message error';
+            document.querySelector('main').prepend(bundleStatus);
+        }
+        bundleStatus.textContent = text;
+        bundleStatus.hidden = false;
+    }
+
+    function pendingBundles() {
+        return JSON.parse(localStorage.getItem(PENDING_KEY) || '[]');
+    }
+
+    function savePendingBundles(bundles) {
+        if (bundles.length) {
+            localStorage.setItem(PENDING_KEY, JSON.stringify(bundles));
+        } else {
+            localStorage.removeItem(PENDING_KEY);
+        }
+    }
+
+    async function compress(text) {
+        if (!window.CompressionStream) {
+            return { body: text, encoding: null };
+        }
+        const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+        return { body: await new Response(stream).blob(), encoding: 'gzip' };
+    }
+
+    async function postBundle(pending) {
+        const payload = await compress(JSON.stringify(pending.bundle));
+        const headers = { 'Content-Type': 'application/json' };
+        if (payload.encoding) {
+            headers['Content-Encoding'] = payload.encoding;
+        }
+        return fetch(pending.url, { method: 'POST', headers: headers, body: payload.body, credentials: 'same-origin' });
+    }
+
+    function scheduleRetry() {
+        if (retryTimer) {
+            return;
+        }
+        // Exponential backoff with jitter so reconnecting clients do not retry in lockstep
+        const delay = retryDelay * (0.5 + Math.random());
+        retryDelay = Math.min(retryDelay * 2, 60000);
+        retryTimer = setTimeout(function() {
+            retryTimer = null;
+            sendPendingBundles();
+        }, delay);
+    }
+
+    async function sendPendingBundles() {
+        for (const pending of pendingBundles()) {
+            let response;
+            try {
+                response = await postBundle(pending);
+            } catch (error) {
+                response = null;
+            }
+            if (!response || response.status >= 500) {
+                showStatus('You appear to be offline. Your answers are saved on this device and will be sent automatically.');
+                scheduleRetry();
+                return;
+            }
+            retryDelay = 1000;
+            const result = await response.json().catch(() => ({}));
+            if (response.status === 403) {
+                // Another student is logged in, or the signature no longer checks
+                // out: keep the answers and try again on a later page load
+                showStatus((result.error || 'Your answers could not be submitted.') +
+                           ' They are kept on this device and will be sent again on a later visit.');
+                continue;
+            }
+            // Accepted or permanently rejected: either way stop sending it
+            savePendingBundles(pendingBundles().filter(p => p.bundle.t !== pending.bundle.t));
+            if (!response.ok) {
+                showStatus(result.error || 'Your answers could not be submitted.');
+            } else if (examForm && result.redirect && pending.bundle.t === examForm.dataset.bundleToken) {
+                // Only the exam on this page leaves it; older bundles sent
+                // from here must not interrupt the student
+                window.location = result.redirect;
+                return;
+            }
+        }
+    }
+
+    if (window.localStorage && window.fetch) {
+        window.addEventListener('online', function() {
+            clearTimeout(retryTimer);
+            retryTimer = null;
+            sendPendingBundles();
+        });
+        sendPendingBundles();
+    }
+
+    if (examForm && examForm.dataset.bundleToken && window.localStorage && window.fetch) {
+        // Per attempt, so another student on a shared machine never sees them
+        const answersKey = `attempt-${examForm.dataset.attemptId}-answers`;
+        const answers = JSON.parse(localStorage.getItem(answersKey) || '{}');
+
+        // Restore answers picked before a reload
+        Object.keys(answers).forEach(questionId => {
+            const input = examForm.querySelector(`input[name="question_${questionId}"][value="${answers[questionId]}"]`);
+            if (input) {
+                input.checked = true;
+            }
+        });
+
+        examForm.addEventListener('change', function(event) {
+            const match = event.target.name.match(/^question_(\d+)$/);
+            if (match) {
+                answers[match[1]] = event.target.value;
+                localStorage.setItem(answersKey, JSON.stringify(answers));
+            }
+        });
+
+        submitExam = function() {
+            const bundles = pendingBundles();
+            bundles.push({ url: examForm.dataset.bundleUrl, bundle: { t: examForm.dataset.bundleToken, a: answers } });
+            savePendingBundles(bundles);
+            localStorage.removeItem(answersKey);
+            examForm.querySelector('button[type="submit"]').disabled = true;
+            showStatus('Submitting your answers...');
+            sendPendingBundles();
+        };
+
+        examForm.addEventListener('submit', function(event) {
+            event.preventDefault();
+            submitExam();
+        });
+    }
+
     // Timer functionality for exams
     const timerElement = document.getElementById('timer');
     if (timerElement) {
@@ -16,7 +161,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (timeLeft <= 0) {
                 clearInterval(timerInterval);
                 alert('Time is up! Your exam will be submitted automatically.');
-                document.getElementById('exam-form').submit();
+                submitExam();
             }
         }, 1000);
     }
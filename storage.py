@@ -0,0 +1,959 @@
+# storage.py
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import psycopg2
+    import psycopg2.extras
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
+
+class IntegrityError(Exception):
+    """Raised when a write violates a unique or foreign key constraint."""
+
+
+class Storage:
+    """Repository for users, exams, questions, results and attempts.
+
+    Every query is written once here with ``?`` placeholders and a statement
+    name.  Backends only decide how a named statement is executed, so the
+    routes in app.py never see which database is underneath.  Rows support
+    both ``row['column']`` and ``row[index]`` access.
+    """
+
+    # Backend hooks
+    def init_schema(self):
+        raise NotImplementedError
+
+    def _fetchone(self, name, sql, params=()):
+        raise NotImplementedError
+
+    def _fetchall(self, name, sql, params=()):
+        raise NotImplementedError
+
+    def _execute(self, name, sql, params=()):
+        raise NotImplementedError
+
+    def _insert(self, name, sql, params=()):
+        raise NotImplementedError
+
+    def _transaction(self, archive=False):
+        # Context manager yielding tx(name, sql, params=(), many=False, insert=False)
+        # which returns the rowcount; many=True runs the statement once per
+        # row of params, insert=True returns the new row's id instead.
+        # archive=True when the transaction touches archive.* tables
+        raise NotImplementedError
+
+    def table_size(self, table):
+        """On-disk bytes used by ``table`` and its indexes, or None if unknown."""
+        return None
+
+    def close(self):
+        pass
+
+    def _scalar(self, name, sql, params=()):
+        row = self._fetchone(name, sql, params)
+        return row[0] if row else None
+
+    # Users
+    def create_user(self, username, password_hash, email, role='student'):
+        return self._insert('create_user',
+                            'INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)',
+                            (username, password_hash, email, role))
+
+    def get_user(self, user_id):
+        return self._fetchone('get_user', 'SELECT * FROM users WHERE id = ?', (user_id,))
+
+    def get_user_by_username(self, username):
+        return self._fetchone('get_user_by_username',
+                              'SELECT * FROM users WHERE username = ? AND deleted_at IS NULL', (username,))
+
+    def list_users_by_role(self, role):
+        return self._fetchall('list_users_by_role',
+                              'SELECT * FROM users WHERE role = ? AND deleted_at IS NULL ORDER BY id', (role,))
+
+    def count_users_by_role(self, role):
+        return self._scalar('count_users_by_role',
+                            'SELECT COUNT(*) FROM users WHERE role = ? AND deleted_at IS NULL', (role,))
+
+    def soft_delete_student(self, user_id):
+        """Hide a student immediately and queue a purge job for their data."""
+        now = datetime.now()
+        with self._transaction() as tx:
+            hidden = tx('soft_delete_student',
+                        'UPDATE users SET deleted_at = ? WHERE id = ? AND role = ? AND deleted_at IS NULL',
+                        (now, user_id, 'student'))
+            if hidden:
+                tx('queue_student_purge', '''
+                INSERT INTO purge_jobs (kind, target_id, label, status, rows_deleted, created_at)
+                SELECT 'student', id, username, 'pending', 0, ? FROM users WHERE id = ?
+                ''', (now, user_id))
+        return bool(hidden)
+
+    # Exams
+    def create_exam(self, title, description, time_limit, starts_at=None, ends_at=None):
+        return self._insert('create_exam', '''
+        INSERT INTO exams (title, description, time_limit, starts_at, ends_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (title, description, time_limit, starts_at, ends_at, datetime.now()))
+
+    def get_exam(self, exam_id):
+        return self._fetchone('get_exam', 'SELECT * FROM exams WHERE id = ? AND deleted_at IS NULL', (exam_id,))
+
+    def list_exams(self):
+        return self._fetchall('list_exams', 'SELECT * FROM exams WHERE deleted_at IS NULL ORDER BY id')
+
+    def count_exams(self):
+        return self._scalar('count_exams', 'SELECT COUNT(*) FROM exams WHERE deleted_at IS NULL')
+
+    def update_exam(self, exam_id, title, description, time_limit, starts_at=None, ends_at=None):
+        self._execute('update_exam', '''
+        UPDATE exams SET title = ?, description = ?, time_limit = ?, starts_at = ?, ends_at = ?, updated_at = ?
+        WHERE id = ?
+        ''', (title, description, time_limit, starts_at, ends_at, datetime.now(), exam_id))
+
+    def exam_version(self, exam_id):
+        """``(updated_at, deleted_at)`` of an exam, for checking cached copies."""
+        return self._fetchone('exam_version', 'SELECT updated_at, deleted_at FROM exams WHERE id = ?', (exam_id,))
+
+    def exams_opening_between(self, start, end):
+        return self._fetchall('exams_opening_between', '''
+        SELECT * FROM exams WHERE deleted_at IS NULL AND starts_at >= ? AND starts_at <= ? ORDER BY starts_at
+        ''', (start, end))
+
+    def soft_delete_exam(self, exam_id):
+        """Hide an exam immediately and queue a purge job for its data."""
+        now = datetime.now()
+        with self._transaction() as tx:
+            hidden = tx('soft_delete_exam',
+                        'UPDATE exams SET deleted_at = ?, updated_at = ? WHERE id = ? AND deleted_at IS NULL',
+                        (now, now, exam_id))
+            if hidden:
+                tx('queue_exam_purge', '''
+                INSERT INTO purge_jobs (kind, target_id, label, status, rows_deleted, created_at)
+                SELECT 'exam', id, title, 'pending', 0, ? FROM exams WHERE id = ?
+                ''', (now, exam_id))
+        return bool(hidden)
+
+    # Questions
+    # Question writes also bump exams.updated_at, which cached copies of the
+    # exam are checked against
+    def add_question(self, exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer):
+        with self._transaction() as tx:
+            question_id = tx('add_question', '''
+            INSERT INTO questions (exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer), insert=True)
+            tx('touch_exam', 'UPDATE exams SET updated_at = ? WHERE id = ?', (datetime.now(), exam_id))
+        return question_id
+
+    def get_question(self, question_id):
+        return self._fetchone('get_question', 'SELECT * FROM questions WHERE id = ?', (question_id,))
+
+    def list_questions(self, exam_id):
+        return self._fetchall('list_questions', 'SELECT * FROM questions WHERE exam_id = ? ORDER BY id', (exam_id,))
+
+    def answer_key(self, exam_id):
+        return self._fetchall('answer_key', 'SELECT id, correct_answer FROM questions WHERE exam_id = ?', (exam_id,))
+
+    def count_questions(self, exam_id=None):
+        if exam_id is None:
+            return self._scalar('count_questions', '''
+            SELECT COUNT(*) FROM questions q JOIN exams e ON q.exam_id = e.id WHERE e.deleted_at IS NULL
+            ''')
+        return self._scalar('count_exam_questions', 'SELECT COUNT(*) FROM questions WHERE exam_id = ?', (exam_id,))
+
+    def delete_question(self, question_id):
+        with self._transaction() as tx:
+            tx('touch_question_exam', '''
+            UPDATE exams SET updated_at = ? WHERE id = (SELECT exam_id FROM questions WHERE id = ?)
+            ''', (datetime.now(), question_id))
+            tx('delete_question', 'DELETE FROM questions WHERE id = ?', (question_id,))
+
+    # Results
+    def record_result(self, user_id, exam_id, score, total_questions, date_taken=None):
+        return self._insert('record_result', '''
+        INSERT INTO results (user_id, exam_id, score, total_questions, date_taken)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, exam_id, score, total_questions, date_taken or datetime.now()))
+
+    def user_results(self, user_id):
+        return self._fetchall('user_results', '''
+        SELECT r.id, e.title, r.score, r.total_questions, r.date_taken
+        FROM results r
+        JOIN exams e ON r.exam_id = e.id
+        WHERE r.user_id = ? AND e.deleted_at IS NULL
+        ORDER BY r.date_taken DESC
+        ''', (user_id,))
+
+    def recent_results(self, limit=10):
+        return self._fetchall('recent_results', '''
+        SELECT u.username, e.title, r.score, r.total_questions, r.date_taken
+        FROM results r
+        JOIN users u ON r.user_id = u.id
+        JOIN exams e ON r.exam_id = e.id
+        WHERE u.deleted_at IS NULL AND e.deleted_at IS NULL
+        ORDER BY r.date_taken DESC
+        LIMIT ?
+        ''', (limit,))
+
+    def all_results(self, include_archived=False):
+        if include_archived:
+            return self._fetchall('all_results_with_archive', '''
+            SELECT r.id, u.username, e.title, r.score, r.total_questions, r.date_taken, 0 AS archived
+            FROM results r
+            JOIN users u ON r.user_id = u.id
+            JOIN exams e ON r.exam_id = e.id
+            WHERE u.deleted_at IS NULL AND e.deleted_at IS NULL
+            UNION ALL
+            SELECT a.id, u.username, e.title, a.score, a.total_questions, a.date_taken, 1 AS archived
+            FROM archive.results a
+            JOIN users u ON a.user_id = u.id
+            JOIN exams e ON a.exam_id = e.id
+            WHERE u.deleted_at IS NULL AND e.deleted_at IS NULL
+            ORDER BY date_taken DESC
+            ''')
+        return self._fetchall('all_results', '''
+        SELECT r.id, u.username, e.title, r.score, r.total_questions, r.date_taken, 0 AS archived
+        FROM results r
+        JOIN users u ON r.user_id = u.id
+        JOIN exams e ON r.exam_id = e.id
+        WHERE u.deleted_at IS NULL AND e.deleted_at IS NULL
+        ORDER BY r.date_taken DESC
+        ''')
+
+    def get_result(self, result_id):
+        return self._fetchone('get_result', 'SELECT * FROM results WHERE id = ?', (result_id,))
+
+    def user_data_version(self, user_id):
+        """Cheap fingerprint of everything the student dashboard and results pages show.
+
+        Result count and latest date_taken for the user (both answered from
+        idx_results_user_id) plus the exam count and last exam write.
+        """
+        return tuple(self._fetchone('user_data_version', '''
+        SELECT (SELECT COUNT(*) FROM results WHERE user_id = ?),
+               (SELECT MAX(date_taken) FROM results WHERE user_id = ?),
+               (SELECT COUNT(*) FROM exams WHERE deleted_at IS NULL),
+               (SELECT MAX(updated_at) FROM exams)
+        ''', (user_id, user_id)))
+
+    def count_results(self):
+        return self._scalar('count_results', '''
+        SELECT COUNT(*)
+        FROM results r
+        JOIN users u ON r.user_id = u.id
+        JOIN exams e ON r.exam_id = e.id
+        WHERE u.deleted_at IS NULL AND e.deleted_at IS NULL
+        ''')
+
+    def count_archived_results(self):
+        return self._scalar('count_archived_results', '''
+        SELECT COALESCE(SUM(s.attempts), 0)
+        FROM result_summaries s
+        JOIN users u ON s.user_id = u.id
+        JOIN exams e ON s.exam_id = e.id
+        WHERE u.deleted_at IS NULL AND e.deleted_at IS NULL
+        ''')
+
+    def archive_results_batch(self, before, batch_size):
+        """Move up to ``batch_size`` results taken before ``before`` to the archive.
+
+        Rows are copied to archive.results first and only then folded into
+        result_summaries and deleted from the hot table.  A batch
+        interrupted between the two steps is simply redone, the copy taking
+        over rows already archived.  Copies of rows deleted from the hot
+        table in between (e.g. by an admin) are dropped again, so the
+        archive only holds rows counted in result_summaries.  Returns the
+        number of rows moved.
+        """
+        last_id = self._scalar('archive_batch_end', '''
+        SELECT MAX(id) FROM (SELECT id FROM results WHERE date_taken < ? ORDER BY id LIMIT ?) batch
+        ''', (before, batch_size))
+        if last_id is None:
+            return 0
+        params = (before, last_id)
+        # Marks the rows copied by this batch
+        archived_at = datetime.now()
+        with self._transaction(archive=True) as tx:
+            tx('archive_copy', '''
+            INSERT INTO archive.results (id, user_id, exam_id, score, total_questions, date_taken, archived_at)
+            SELECT id, user_id, exam_id, score, total_questions, date_taken, ?
+            FROM results WHERE date_taken < ? AND id <= ?
+            ON CONFLICT (id) DO UPDATE SET archived_at = excluded.archived_at
+            ''', (archived_at,) + params)
+        with self._transaction(archive=True) as tx:
+            tx('archive_drop_deleted', '''
+            DELETE FROM archive.results
+            WHERE archived_at = ? AND id NOT IN (SELECT id FROM results WHERE date_taken < ? AND id <= ?)
+            ''', (archived_at,) + params)
+            tx('archive_summarize', '''
+            INSERT INTO result_summaries (user_id, exam_id, attempts, total_score, total_questions, best_score, last_taken)
+            SELECT user_id, exam_id, COUNT(*), SUM(score), SUM(total_questions), MAX(score), MAX(date_taken)
+            FROM results WHERE date_taken < ? AND id <= ?
+            GROUP BY user_id, exam_id
+            ON CONFLICT (user_id, exam_id) DO UPDATE SET
+                attempts = result_summaries.attempts + excluded.attempts,
+                total_score = result_summaries.total_score + excluded.total_score,
+                total_questions = result_summaries.total_questions + excluded.total_questions,
+                best_score = CASE WHEN excluded.best_score > result_summaries.best_score
+                                  THEN excluded.best_score ELSE result_summaries.best_score END,
+                last_taken = CASE WHEN excluded.last_taken > result_summaries.last_taken
+                                  THEN excluded.last_taken ELSE result_summaries.last_taken END
+            ''', params)
+            return tx('archive_delete', 'DELETE FROM results WHERE date_taken < ? AND id <= ?', params)
+
+    def delete_result(self, result_id):
+        # attempts.result_id is ON DELETE SET NULL
+        self._execute('delete_result', 'DELETE FROM results WHERE id = ?', (result_id,))
+
+    # Attempts
+    def start_attempt(self, user_id, exam_id, started_at=None):
+        return self._insert('start_attempt',
+                            'INSERT INTO attempts (user_id, exam_id, started_at) VALUES (?, ?, ?)',
+                            (user_id, exam_id, started_at or datetime.now()))
+
+    def get_attempt(self, attempt_id):
+        return self._fetchone('get_attempt', 'SELECT * FROM attempts WHERE id = ?', (attempt_id,))
+
+    def finish_attempt(self, attempt_id, result_id, submitted_at=None):
+        self._execute('finish_attempt',
+                      'UPDATE attempts SET result_id = ?, submitted_at = ? WHERE id = ?',
+                      (result_id, submitted_at or datetime.now(), attempt_id))
+
+    def record_answer_bundle(self, attempt_id, score, total_questions, answers, submitted_at=None):
+        """Store a graded answer bundle for an open attempt in one transaction.
+
+        ``answers`` is a list of ``(question_id, answer, correct)``.  The
+        attempt is claimed first, so a bundle re-sent after a dropped
+        response stores nothing and returns the attempt's existing
+        result_id, or None if the attempt no longer exists.  Returns
+        ``(result_id, stored)``.
+        """
+        submitted_at = submitted_at or datetime.now()
+        result_id = None
+        with self._transaction() as tx:
+            claimed = tx('claim_attempt',
+                         'UPDATE attempts SET submitted_at = ? WHERE id = ? AND submitted_at IS NULL',
+                         (submitted_at, attempt_id))
+            if claimed:
+                tx('insert_answers', '''
+                INSERT INTO answers (attempt_id, question_id, answer, correct) VALUES (?, ?, ?, ?)
+                ''', [(attempt_id, question_id, answer, int(correct)) for question_id, answer, correct in answers],
+                   many=True)
+                result_id = tx('insert_bundle_result', '''
+                INSERT INTO results (user_id, exam_id, score, total_questions, date_taken)
+                SELECT user_id, exam_id, ?, ?, ? FROM attempts WHERE id = ?
+                ''', (score, total_questions, submitted_at, attempt_id), insert=True)
+                tx('link_bundle_result', 'UPDATE attempts SET result_id = ? WHERE id = ?', (result_id, attempt_id))
+        if result_id is None:
+            # Already submitted, or the attempt itself is gone (e.g. purged)
+            attempt = self.get_attempt(attempt_id)
+            result_id = attempt['result_id'] if attempt else None
+        return result_id, bool(claimed)
+
+    # Background purges
+    # Child rows removed batch by batch before the parent row itself, each
+    # given as a query for up to ``?`` ids belonging to the target.  Any
+    # stragglers are caught by ON DELETE CASCADE when the parent goes, so
+    # grandchildren (answers) come first to keep those cascades small.
+    PURGE_PLAN = {
+        'exam': ('exams', [
+            ('answers', 'SELECT a.id FROM answers a JOIN attempts t ON a.attempt_id = t.id '
+                        'WHERE t.exam_id = ? LIMIT ?'),
+            ('attempts', 'SELECT id FROM attempts WHERE exam_id = ? LIMIT ?'),
+            ('results', 'SELECT id FROM results WHERE exam_id = ? LIMIT ?'),
+            ('archive.results', 'SELECT id FROM archive.results WHERE exam_id = ? LIMIT ?'),
+            ('result_summaries', 'SELECT id FROM result_summaries WHERE exam_id = ? LIMIT ?'),
+            ('questions', 'SELECT id FROM questions WHERE exam_id = ? LIMIT ?'),
+        ]),
+        'student': ('users', [
+            ('answers', 'SELECT a.id FROM answers a JOIN attempts t ON a.attempt_id = t.id '
+                        'WHERE t.user_id = ? LIMIT ?'),
+            ('attempts', 'SELECT id FROM attempts WHERE user_id = ? LIMIT ?'),
+            ('results', 'SELECT id FROM results WHERE user_id = ? LIMIT ?'),
+            ('archive.results', 'SELECT id FROM archive.results WHERE user_id = ? LIMIT ?'),
+            ('result_summaries', 'SELECT id FROM result_summaries WHERE user_id = ? LIMIT ?'),
+        ]),
+    }
+
+    def list_purge_jobs(self, limit=10):
+        return self._fetchall('list_purge_jobs', 'SELECT * FROM purge_jobs ORDER BY id DESC LIMIT ?', (limit,))
+
+    def claim_purge_job(self, owner, stale_after):
+        """Claim the oldest runnable job for ``owner`` and return it, or None.
+
+        Runnable means pending, or running under a claim that has not been
+        renewed for ``stale_after`` seconds because its worker died.  Jobs
+        another live worker is still purging are left alone.
+        """
+        now = datetime.now()
+        stale_before = now - timedelta(seconds=stale_after)
+        job = self._fetchone('next_purge_job', '''
+        SELECT * FROM purge_jobs
+        WHERE status = 'pending' OR (status = 'running' AND (claimed_at IS NULL OR claimed_at < ?))
+        ORDER BY id LIMIT 1
+        ''', (stale_before,))
+        if job and self._execute('claim_purge_job', '''
+        UPDATE purge_jobs SET status = 'running', owner = ?, claimed_at = ?
+        WHERE id = ? AND (status = 'pending' OR (status = 'running' AND (claimed_at IS NULL OR claimed_at < ?)))
+        ''', (owner, now, job['id'], stale_before)):
+            return job
+        return None
+
+    def purge_batch(self, job, batch_size, owner):
+        """Delete up to ``batch_size`` rows for ``job`` in one short transaction.
+
+        Each batch renews ``owner``'s claim on the job first.  Returns
+        ``(rows_deleted, done)``; done is also True, with nothing deleted,
+        when the job has since been claimed by another worker.
+        """
+        parent, children = self.PURGE_PLAN[job['kind']]
+        done = False
+        with self._transaction(archive=True) as tx:
+            if not tx('renew_purge_claim', '''
+            UPDATE purge_jobs SET claimed_at = ? WHERE id = ? AND owner = ? AND status = 'running'
+            ''', (datetime.now(), job['id'], owner)):
+                return 0, True
+            for table, ids in children:
+                deleted = tx(f'purge_{job["kind"]}_{table.replace(".", "_")}',
+                             f'DELETE FROM {table} WHERE id IN ({ids})', (job['target_id'], batch_size))
+                if deleted:
+                    break
+            else:
+                deleted = tx(f'purge_{parent}', f'DELETE FROM {parent} WHERE id = ? AND deleted_at IS NOT NULL',
+                             (job['target_id'],))
+                tx('finish_purge_job', "UPDATE purge_jobs SET status = 'done', finished_at = ? WHERE id = ?",
+                   (datetime.now(), job['id']))
+                done = True
+            tx('purge_job_progress', 'UPDATE purge_jobs SET rows_deleted = rows_deleted + ? WHERE id = ?',
+               (deleted, job['id']))
+        return deleted, done
+
+
+class SQLiteStorage(Storage):
+    """Single-file backend.  Opens a short-lived connection per operation.
+
+    Archived results live in a second file, by default ``<name>_archive.db``
+    next to the main database.  It is attached as ``archive`` only to
+    connections whose statements reference ``archive.``, so hot-path queries
+    do not pay for the ATTACH.
+    """
+
+    def __init__(self, path='exam_system.db', archive_path=None):
+        self.path = path
+        self.archive_path = archive_path or os.path.splitext(path)[0] + '_archive.db'
+
+    def _connect(self, archive=False):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        if archive:
+            conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+        return conn
+
+    @staticmethod
+    def _uses_archive(sql):
+        return 'archive.' in sql
+
+    @contextmanager
+    def _connection(self, archive=False):
+        conn = self._connect(archive)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    TABLES = {
+        'users': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                role TEXT DEFAULT 'student',
+                deleted_at TIMESTAMP
+            )''',
+        'exams': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT,
+                time_limit INTEGER DEFAULT 30,
+                deleted_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                starts_at TIMESTAMP,
+                ends_at TIMESTAMP
+            )''',
+        'questions': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                exam_id INTEGER,
+                question_text TEXT NOT NULL,
+                option_a TEXT NOT NULL,
+                option_b TEXT NOT NULL,
+                option_c TEXT NOT NULL,
+                option_d TEXT NOT NULL,
+                correct_answer TEXT NOT NULL,
+                FOREIGN KEY (exam_id) REFERENCES exams (id) ON DELETE CASCADE
+            )''',
+        'results': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                exam_id INTEGER,
+                score INTEGER,
+                total_questions INTEGER,
+                date_taken TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                FOREIGN KEY (exam_id) REFERENCES exams (id) ON DELETE CASCADE
+            )''',
+        'attempts': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                exam_id INTEGER NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                submitted_at TIMESTAMP,
+                result_id INTEGER,
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                FOREIGN KEY (exam_id) REFERENCES exams (id) ON DELETE CASCADE,
+                FOREIGN KEY (result_id) REFERENCES results (id) ON DELETE SET NULL
+            )''',
+        'result_summaries': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                exam_id INTEGER NOT NULL,
+                attempts INTEGER NOT NULL,
+                total_score INTEGER NOT NULL,
+                total_questions INTEGER NOT NULL,
+                best_score INTEGER,
+                last_taken TIMESTAMP,
+                UNIQUE (user_id, exam_id),
+                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                FOREIGN KEY (exam_id) REFERENCES exams (id) ON DELETE CASCADE
+            )''',
+        'answers': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                attempt_id INTEGER NOT NULL,
+                question_id INTEGER NOT NULL,
+                answer TEXT,
+                correct INTEGER NOT NULL,
+                FOREIGN KEY (attempt_id) REFERENCES attempts (id) ON DELETE CASCADE,
+                FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+            )''',
+        'purge_jobs': '''
+            CREATE TABLE {name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                label TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                rows_deleted INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                owner TEXT,
+                claimed_at TIMESTAMP
+            )''',
+    }
+
+    INDEXES = [
+        'CREATE INDEX IF NOT EXISTS idx_questions_exam_id ON questions (exam_id)',
+        'CREATE INDEX IF NOT EXISTS idx_results_exam_id ON results (exam_id)',
+        'CREATE INDEX IF NOT EXISTS idx_results_user_id ON results (user_id, date_taken)',
+        'CREATE INDEX IF NOT EXISTS idx_results_date_taken ON results (date_taken)',
+        'CREATE INDEX IF NOT EXISTS idx_result_summaries_exam_id ON result_summaries (exam_id)',
+        'CREATE INDEX IF NOT EXISTS idx_attempts_exam_id ON attempts (exam_id)',
+        'CREATE INDEX IF NOT EXISTS idx_attempts_user_id ON attempts (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_attempts_result_id ON attempts (result_id)',
+        'CREATE INDEX IF NOT EXISTS idx_answers_attempt_id ON answers (attempt_id)',
+        'CREATE INDEX IF NOT EXISTS idx_answers_question_id ON answers (question_id)',
+        'CREATE INDEX IF NOT EXISTS idx_purge_jobs_status ON purge_jobs (status, id)',
+    ]
+
+    # Append-only copy of archived results in the attached archive database
+    ARCHIVE = '''
+    CREATE TABLE IF NOT EXISTS archive.results (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        exam_id INTEGER,
+        score INTEGER,
+        total_questions INTEGER,
+        date_taken TIMESTAMP,
+        archived_at TIMESTAMP NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS archive.idx_results_exam_id ON results (exam_id);
+    CREATE INDEX IF NOT EXISTS archive.idx_results_user_id ON results (user_id);
+    CREATE INDEX IF NOT EXISTS archive.idx_results_archived_at ON results (archived_at);
+    '''
+
+    def init_schema(self):
+        with self._connection(archive=True) as conn:
+            # WAL lets students keep reading while a purge batch holds the write lock
+            conn.execute('PRAGMA journal_mode = WAL')
+            # Foreign keys stay off while tables are rebuilt
+            conn.execute('PRAGMA foreign_keys = OFF')
+            for table, ddl in self.TABLES.items():
+                columns = [row['name'] for row in conn.execute(f'PRAGMA table_info({table})')]
+                if not columns:
+                    conn.execute(ddl.format(name=table))
+                elif self._outdated(conn, table, columns):
+                    self._rebuild(conn, table, ddl, columns)
+            for index in self.INDEXES:
+                conn.execute(index)
+            conn.execute('PRAGMA archive.journal_mode = WAL')
+            conn.executescript(self.ARCHIVE)
+            conn.commit()
+
+    # Columns added after the first release of each table
+    ADDED_COLUMNS = {
+        'users': ['deleted_at'],
+        'exams': ['deleted_at', 'updated_at', 'starts_at', 'ends_at'],
+        'purge_jobs': ['owner', 'claimed_at'],
+    }
+
+    def _outdated(self, conn, table, columns):
+        # Databases created before soft deletes, cascading foreign keys, etc.
+        if any(column not in columns for column in self.ADDED_COLUMNS.get(table, [])):
+            return True
+        return any(fk['on_delete'] == 'NO ACTION' for fk in conn.execute(f'PRAGMA foreign_key_list({table})'))
+
+    def table_size(self, table):
+        schema, _, name = table.rpartition('.')
+        schema = schema or 'main'
+        try:
+            return self._scalar('table_size', f'''
+            SELECT SUM(d.pgsize)
+            FROM dbstat(?) d
+            JOIN {schema}.sqlite_master m ON m.name = d.name
+            WHERE m.tbl_name = ?
+            ''', (schema, name))
+        except sqlite3.OperationalError:
+            # SQLite built without the dbstat virtual table
+            return None
+
+    @staticmethod
+    def _rebuild(conn, table, ddl, columns):
+        # SQLite cannot alter constraints, so copy into a fresh table and swap
+        # it in (https://www.sqlite.org/lang_altertable.html#otheralter)
+        conn.execute(ddl.format(name=f'new_{table}'))
+        column_list = ', '.join(columns)
+        conn.execute(f'INSERT INTO new_{table} ({column_list}) SELECT {column_list} FROM {table}')
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE new_{table} RENAME TO {table}')
+
+    def _fetchone(self, name, sql, params=()):
+        with self._connection(self._uses_archive(sql)) as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, name, sql, params=()):
+        with self._connection(self._uses_archive(sql)) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _execute(self, name, sql, params=()):
+        with self._connection(self._uses_archive(sql)) as conn:
+            try:
+                rowcount = conn.execute(sql, params).rowcount
+                conn.commit()
+            except sqlite3.IntegrityError as e:
+                raise IntegrityError(str(e)) from e
+            return rowcount
+
+    def _insert(self, name, sql, params=()):
+        with self._connection(self._uses_archive(sql)) as conn:
+            try:
+                row_id = conn.execute(sql, params).lastrowid
+                conn.commit()
+            except sqlite3.IntegrityError as e:
+                raise IntegrityError(str(e)) from e
+            return row_id
+
+    @contextmanager
+    def _transaction(self, archive=False):
+        # The archive must be attached up front: ATTACH is not allowed
+        # once the transaction has started
+        with self._connection(archive) as conn:
+            def tx(name, sql, params=(), many=False, insert=False):
+                if many:
+                    return conn.executemany(sql, params).rowcount
+                cursor = conn.execute(sql, params)
+                return cursor.lastrowid if insert else cursor.rowcount
+            try:
+                yield tx
+                conn.commit()
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                raise IntegrityError(str(e)) from e
+            except Exception:
+                conn.rollback()
+                raise
+
+
+class PostgresStorage(Storage):
+    """Client-server backend for PostgreSQL.
+
+    Connections come from a thread-safe pool of ``maxconn`` connections
+    that stay open, and each named statement is sent once per connection
+    with PREPARE and afterwards run with EXECUTE, so repeated queries skip
+    parsing and planning.  Callers wait for a free connection rather than
+    failing when all of them are in use.
+    """
+
+    def __init__(self, dsn, maxconn=10):
+        if psycopg2 is None:
+            raise RuntimeError('PostgresStorage requires psycopg2 (pip install psycopg2-binary)')
+        # minconn == maxconn, so returned connections (and their prepared
+        # statements) are kept instead of closed
+        self.pool = psycopg2.pool.ThreadedConnectionPool(maxconn, maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # Statement names already prepared, keyed by connection
+        self._prepared = {}
+
+    @contextmanager
+    def _connection(self):
+        # getconn() raises PoolError instead of blocking when the pool is empty
+        with self._slots:
+            conn = self.pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                if conn.closed:
+                    # The pool replaces it with a new session that has nothing prepared
+                    self._prepared.pop(conn, None)
+                self.pool.putconn(conn)
+
+    @staticmethod
+    def _numbered(sql):
+        # Rewrite ? placeholders as $1, $2, ... for PREPARE
+        parts = sql.split('?')
+        out = [parts[0]]
+        for i, part in enumerate(parts[1:], start=1):
+            out.append(f'${i}{part}')
+        return ''.join(out), len(parts) - 1
+
+    def _prepare(self, conn, cursor, name, sql):
+        # Returns the EXECUTE statement for ``name``, preparing it on first use
+        prepared = self._prepared.setdefault(conn, set())
+        numbered, count = self._numbered(sql)
+        if name not in prepared:
+            cursor.execute(f'PREPARE {name} AS {numbered}')
+            prepared.add(name)
+        return f'EXECUTE {name} ({", ".join(["%s"] * count)})' if count else f'EXECUTE {name}'
+
+    def _run(self, conn, name, sql, params):
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor.execute(self._prepare(conn, cursor, name, sql), tuple(params))
+        return cursor
+
+    def _run_many(self, conn, name, sql, rows):
+        # execute_batch sends many EXECUTEs per round trip
+        cursor = conn.cursor()
+        psycopg2.extras.execute_batch(cursor, self._prepare(conn, cursor, name, sql), [tuple(r) for r in rows])
+        return len(rows)
+
+    def init_schema(self):
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                role TEXT DEFAULT 'student',
+                deleted_at TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS exams (
+                id SERIAL PRIMARY KEY,
+                title TEXT NOT NULL,
+                description TEXT,
+                time_limit INTEGER DEFAULT 30,
+                deleted_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                starts_at TIMESTAMP,
+                ends_at TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS questions (
+                id SERIAL PRIMARY KEY,
+                exam_id INTEGER REFERENCES exams (id) ON DELETE CASCADE,
+                question_text TEXT NOT NULL,
+                option_a TEXT NOT NULL,
+                option_b TEXT NOT NULL,
+                option_c TEXT NOT NULL,
+                option_d TEXT NOT NULL,
+                correct_answer TEXT NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS results (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users (id) ON DELETE CASCADE,
+                exam_id INTEGER REFERENCES exams (id) ON DELETE CASCADE,
+                score INTEGER,
+                total_questions INTEGER,
+                date_taken TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS attempts (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+                exam_id INTEGER NOT NULL REFERENCES exams (id) ON DELETE CASCADE,
+                started_at TIMESTAMP NOT NULL,
+                submitted_at TIMESTAMP,
+                result_id INTEGER REFERENCES results (id) ON DELETE SET NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS result_summaries (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+                exam_id INTEGER NOT NULL REFERENCES exams (id) ON DELETE CASCADE,
+                attempts INTEGER NOT NULL,
+                total_score INTEGER NOT NULL,
+                total_questions INTEGER NOT NULL,
+                best_score INTEGER,
+                last_taken TIMESTAMP,
+                UNIQUE (user_id, exam_id)
+            );
+
+            CREATE SCHEMA IF NOT EXISTS archive;
+            CREATE TABLE IF NOT EXISTS archive.results (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                exam_id INTEGER,
+                score INTEGER,
+                total_questions INTEGER,
+                date_taken TIMESTAMP,
+                archived_at TIMESTAMP NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_archive_results_exam_id ON archive.results (exam_id);
+            CREATE INDEX IF NOT EXISTS idx_archive_results_user_id ON archive.results (user_id);
+            CREATE INDEX IF NOT EXISTS idx_archive_results_archived_at ON archive.results (archived_at);
+
+            CREATE TABLE IF NOT EXISTS answers (
+                id SERIAL PRIMARY KEY,
+                attempt_id INTEGER NOT NULL REFERENCES attempts (id) ON DELETE CASCADE,
+                question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+                answer TEXT,
+                correct INTEGER NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS purge_jobs (
+                id SERIAL PRIMARY KEY,
+                kind TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                label TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                rows_deleted INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP NOT NULL,
+                finished_at TIMESTAMP,
+                owner TEXT,
+                claimed_at TIMESTAMP
+            );
+
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
+            ALTER TABLE exams ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
+            ALTER TABLE exams ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+            ALTER TABLE exams ADD COLUMN IF NOT EXISTS starts_at TIMESTAMP;
+            ALTER TABLE exams ADD COLUMN IF NOT EXISTS ends_at TIMESTAMP;
+            ALTER TABLE purge_jobs ADD COLUMN IF NOT EXISTS owner TEXT;
+            ALTER TABLE purge_jobs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+
+            CREATE INDEX IF NOT EXISTS idx_questions_exam_id ON questions (exam_id);
+            CREATE INDEX IF NOT EXISTS idx_results_exam_id ON results (exam_id);
+            CREATE INDEX IF NOT EXISTS idx_results_user_id ON results (user_id, date_taken);
+            CREATE INDEX IF NOT EXISTS idx_results_date_taken ON results (date_taken);
+            CREATE INDEX IF NOT EXISTS idx_result_summaries_exam_id ON result_summaries (exam_id);
+            CREATE INDEX IF NOT EXISTS idx_attempts_exam_id ON attempts (exam_id);
+            CREATE INDEX IF NOT EXISTS idx_attempts_user_id ON attempts (user_id);
+            CREATE INDEX IF NOT EXISTS idx_attempts_result_id ON attempts (result_id);
+            CREATE INDEX IF NOT EXISTS idx_answers_attempt_id ON answers (attempt_id);
+            CREATE INDEX IF NOT EXISTS idx_answers_question_id ON answers (question_id);
+            CREATE INDEX IF NOT EXISTS idx_purge_jobs_status ON purge_jobs (status, id);
+            ''')
+
+            # Databases created before cascading foreign keys keep their
+            # default NO ACTION constraints until replaced here
+            cursor.execute('''
+            SELECT c.conrelid::regclass::text, c.conname, a.attname, c.confrelid::regclass::text
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            WHERE c.contype = 'f' AND c.confdeltype = 'a'
+              AND c.conrelid::regclass::text IN ('questions', 'results', 'attempts')
+            ''')
+            for table, constraint, column, parent in cursor.fetchall():
+                action = 'SET NULL' if column == 'result_id' else 'CASCADE'
+                cursor.execute(f'''
+                ALTER TABLE {table} DROP CONSTRAINT {constraint},
+                ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) REFERENCES {parent} (id) ON DELETE {action}
+                ''')
+
+    def _fetchone(self, name, sql, params=()):
+        with self._connection() as conn:
+            return self._run(conn, name, sql, params).fetchone()
+
+    def _fetchall(self, name, sql, params=()):
+        with self._connection() as conn:
+            return self._run(conn, name, sql, params).fetchall()
+
+    def _execute(self, name, sql, params=()):
+        try:
+            with self._connection() as conn:
+                return self._run(conn, name, sql, params).rowcount
+        except psycopg2.IntegrityError as e:
+            raise IntegrityError(str(e)) from e
+
+    def _insert(self, name, sql, params=()):
+        try:
+            with self._connection() as conn:
+                return self._run(conn, name, sql.rstrip() + ' RETURNING id', params).fetchone()[0]
+        except psycopg2.IntegrityError as e:
+            raise IntegrityError(str(e)) from e
+
+    @contextmanager
+    def _transaction(self, archive=False):
+        # The archive schema is always visible on PostgreSQL
+        try:
+            with self._connection() as conn:
+                def tx(name, sql, params=(), many=False, insert=False):
+                    if many:
+                        return self._run_many(conn, name, sql, params)
+                    if insert:
+                        return self._run(conn, name, sql.rstrip() + ' RETURNING id', params).fetchone()[0]
+                    return self._run(conn, name, sql, params).rowcount
+                yield tx
+        except psycopg2.IntegrityError as e:
+            raise IntegrityError(str(e)) from e
+
+    def table_size(self, table):
+        return self._scalar('table_size', 'SELECT pg_total_relation_size(?::regclass)', (table,))
+
+    def close(self):
+        self.pool.closeall()
+        self._prepared.clear()
+
+
+def get_storage(url=None):
+    """Build the storage backend named by ``url`` or ``DATABASE_URL``.
+
+    ``postgresql://...`` selects PostgresStorage; anything else is treated as
+    a SQLite file path (``sqlite:///path`` or a bare path).
+    """
+    url = url or os.environ.get('DATABASE_URL', 'exam_system.db')
+    if url.startswith(('postgres://', 'postgresql://')):
+        return PostgresStorage(url, maxconn=int(os.environ.get('DATABASE_POOL_SIZE', 10)))
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return SQLiteStorage(url)
@@ -0,0 +1,97 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import PostgresStorage, SQLiteStorage, psycopg2
+
+
+@pytest.fixture(scope='session')
+def postgres_url():
+    """DSN of a local PostgreSQL server for the whole test run.
+
+    Uses ``TEST_POSTGRES_URL`` when set, otherwise starts a throwaway
+    server with pgserver.  Tests needing it are skipped when neither is
+    available.
+    """
+    if psycopg2 is None:
+        pytest.skip('psycopg2 is not installed')
+    url = os.environ.get('TEST_POSTGRES_URL')
+    if url:
+        yield url
+        return
+    try:
+        import pgserver
+    except ImportError:
+        pytest.skip('set TEST_POSTGRES_URL or install pgserver to run PostgreSQL tests')
+    server = pgserver.get_server(tempfile.mkdtemp(prefix='exam-pg-'), cleanup_mode='delete')
+    yield server.get_uri()
+    server.cleanup()
+
+
+def _reset_postgres(url):
+    conn = psycopg2.connect(url)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute('DROP SCHEMA IF EXISTS archive CASCADE; DROP SCHEMA public CASCADE; CREATE SCHEMA public')
+    conn.close()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db = SQLiteStorage(str(tmp_path / 'exam_system.db'))
+    db.init_schema()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def postgres_db(postgres_url):
+    _reset_postgres(postgres_url)
+    db = PostgresStorage(postgres_url, maxconn=4)
+    db.init_schema()
+    yield db
+    db.close()
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def db(request):
+    """Each shared Storage test runs once per backend."""
+    return request.getfixturevalue(f'{request.param}_db')
+
+
+@pytest.fixture(scope='session')
+def exam_app(tmp_path_factory):
+    """The app module, imported once against a scratch SQLite database."""
+    previous = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = str(tmp_path_factory.mktemp('app') / 'exam_system.db')
+    try:
+        import app as exam_app
+    finally:
+        if previous is None:
+            os.environ.pop('DATABASE_URL')
+        else:
+            os.environ['DATABASE_URL'] = previous
+    yield exam_app
+    exam_app.purge_worker.stop()
+    exam_app.prewarmer.stop()
+
+
+_students = iter(range(1, 1_000_000))
+
+
+@pytest.fixture
+def student(exam_app):
+    """A logged-in test client for a new student, and the student's id."""
+    username = f'student{next(_students)}'
+    user_id = exam_app.db.create_user(username, 'hash', f'{username}@example.com')
+    client = exam_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = username
+        sess['role'] = 'student'
+    return client, user_id
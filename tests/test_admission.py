@@ -0,0 +1,146 @@
+# tests/test_admission.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from admission import AdmissionController, exam_window
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_admits_up_to_capacity_then_queues(clock):
+    admission = AdmissionController(2, clock=clock)
+    assert admission.admit(1) == 0
+    assert admission.admit(2) == 0
+    assert admission.admit(3) == 1
+    assert admission.admit(4) == 2
+    assert admission.stats() == {'starting': 2, 'waiting': 2, 'capacity': 2}
+
+
+def test_admitted_student_is_not_queued_again(clock):
+    admission = AdmissionController(1, clock=clock)
+    assert admission.admit(1) == 0
+    assert admission.admit(1) == 0
+    assert admission.stats()['waiting'] == 0
+
+
+def test_release_admits_queue_in_arrival_order(clock):
+    admission = AdmissionController(1, clock=clock)
+    admission.admit(1)
+    assert admission.admit(2) == 1
+    assert admission.admit(3) == 2
+
+    admission.release(1)
+    # Student 3 polls first but student 2 is still ahead
+    assert admission.admit(3) == 2
+    assert admission.admit(2) == 0
+    assert admission.admit(3) == 1
+    admission.release(2)
+    assert admission.admit(3) == 0
+
+
+def test_repolling_keeps_place(clock):
+    admission = AdmissionController(1, lease=100.0, clock=clock)
+    admission.admit(1)
+    admission.admit(2)
+    admission.admit(3)
+    for _ in range(3):
+        clock.now += 5
+        assert admission.admit(2) == 1
+        assert admission.admit(3) == 2
+
+
+def test_lease_frees_slot_never_released(clock):
+    admission = AdmissionController(1, lease=10.0, clock=clock)
+    admission.admit(1)
+    clock.now = 9.0
+    assert admission.admit(2) == 1
+    clock.now = 10.0
+    assert admission.admit(2) == 0
+
+
+def test_stale_queue_entries_are_dropped(clock):
+    admission = AdmissionController(1, lease=100.0, queue_timeout=30.0, clock=clock)
+    admission.admit(1)
+    admission.admit(2)
+    admission.admit(3)
+
+    # Student 2 stops polling, student 3 keeps going
+    clock.now = 20.0
+    assert admission.admit(3) == 2
+    clock.now = 31.0
+    assert admission.admit(3) == 1
+    assert admission.stats()['waiting'] == 1
+
+    # A student who comes back after timing out rejoins at the end
+    assert admission.admit(2) == 2
+
+
+NOW = datetime(2026, 5, 1, 9, 0)
+
+
+@pytest.mark.parametrize('starts_at, ends_at, window', [
+    (None, None, 'open'),
+    (NOW + timedelta(minutes=1), None, 'upcoming'),
+    (NOW, None, 'open'),
+    (None, NOW + timedelta(minutes=1), 'open'),
+    (None, NOW, 'closed'),
+    (NOW - timedelta(hours=1), NOW + timedelta(hours=1), 'open'),
+    # SQLite returns timestamps as text
+    (str(NOW + timedelta(minutes=1)), None, 'upcoming'),
+    ('2026-05-01T08:00:00', '2026-05-01 08:30:00', 'closed'),
+])
+def test_exam_window(starts_at, ends_at, window):
+    assert exam_window({'starts_at': starts_at, 'ends_at': ends_at}, now=NOW) == window
+
+
+@pytest.fixture
+def full(exam_app, monkeypatch):
+    """An admission controller with every slot taken."""
+    admission = AdmissionController(1)
+    admission.admit('someone else')
+    monkeypatch.setattr(exam_app, 'admission', admission)
+    return admission
+
+
+def exam_id(exam_app):
+    return exam_app.db.list_exams()[0]['id']
+
+
+def test_exam_page_releases_slot(exam_app, student, monkeypatch):
+    admission = AdmissionController(1)
+    monkeypatch.setattr(exam_app, 'admission', admission)
+    client, _ = student
+    assert b'exam-form' in client.get(f'/exam/{exam_id(exam_app)}').get_data()
+    assert admission.stats()['starting'] == 0
+
+
+def test_full_admission_shows_waiting_page(exam_app, student, full):
+    client, _ = student
+    response = client.get(f'/exam/{exam_id(exam_app)}')
+    assert b'exam-form' not in response.get_data()
+    assert response.headers['Retry-After']
+    assert full.stats()['waiting'] == 1
+
+
+def test_reload_of_open_attempt_skips_queue(exam_app, student, monkeypatch):
+    client, _ = student
+    url = f'/exam/{exam_id(exam_app)}'
+    assert b'exam-form' in client.get(url).get_data()
+
+    admission = AdmissionController(1)
+    admission.admit('someone else')
+    monkeypatch.setattr(exam_app, 'admission', admission)
+    assert b'exam-form' in client.get(url).get_data()
+    assert admission.stats() == {'starting': 1, 'waiting': 0, 'capacity': 1}
@@ -0,0 +1,104 @@
+# tests/test_assets.py
+import gzip
+import json
+
+import pytest
+from flask import Flask, url_for
+
+import assets
+from build_assets import brotli, build, minify_css, minify_js, session_requests
+
+STYLES = '''/* styles.css */
+.nav a :hover {
+    color: red;
+    margin: 0 auto;
+}
+'''
+
+SCRIPT = '''/* script.js */
+// Say hello
+function hello() {
+    return 'hello'
+}
+'''
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / 'styles.css').write_text(STYLES)
+    (tmp_path / 'script.js').write_text(SCRIPT)
+    build(str(tmp_path))
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    assets.init_app(app)
+    return app
+
+
+def manifest(app):
+    with open(f'{app.static_folder}/dist/manifest.json') as f:
+        return json.load(f)
+
+
+def test_minify_css():
+    assert minify_css(STYLES) == '.nav a :hover{color:red;margin:0 auto}'
+
+
+def test_minify_css_keeps_descendant_combinator():
+    # ".a :hover" matches hovered descendants, ".a:hover" the element itself
+    assert minify_css('.a :hover { color: red; }') == '.a :hover{color:red}'
+    assert minify_css('.a:hover , .b > .c { }') == '.a:hover,.b>.c{}'
+
+
+def test_minify_js_keeps_line_breaks():
+    assert minify_js(SCRIPT) == "function hello() {\nreturn 'hello'\n}"
+
+
+def test_url_for_uses_fingerprinted_file(app):
+    with app.test_request_context():
+        assert url_for('static', filename='styles.css') == f"/static/{manifest(app)['styles.css']}"
+        assert url_for('static', filename='missing.png') == '/static/missing.png'
+
+
+def test_without_manifest_nothing_changes(tmp_path):
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    assets.init_app(app)
+    with app.test_request_context():
+        assert url_for('static', filename='styles.css') == '/static/styles.css'
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('br, gzip', 'br'),
+    ('gzip', 'gzip'),
+    ('', None),
+])
+def test_served_pre_compressed(app, accept, encoding):
+    if encoding == 'br' and brotli is None:
+        pytest.skip('brotli is not installed')
+    url = f"/static/{manifest(app)['styles.css']}"
+    response = app.test_client().get(url, headers={'Accept-Encoding': accept})
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') == encoding
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.vary
+    body = response.get_data()
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    elif encoding == 'br':
+        body = brotli.decompress(body)
+    assert body == minify_css(STYLES).encode('utf-8')
+
+
+def test_immutable_and_not_modified(app):
+    client = app.test_client()
+    url = f"/static/{manifest(app)['script.js']}"
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == assets.IMMUTABLE
+    etag = response.headers['ETag']
+
+    again = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+
+def test_session_requests():
+    before, cold, warm = session_requests()
+    assert (before, cold, warm) == (8, 2, 0)
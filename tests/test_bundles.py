@@ -0,0 +1,93 @@
+# tests/test_bundles.py
+import gzip
+import json
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from bundles import MAX_BUNDLE_BYTES, BundleError, BundleSignatureError, issue_token, load_bundle
+
+
+def bundle(token, answers, compress=True):
+    body = json.dumps({'t': token, 'a': answers}).encode('utf-8')
+    return (gzip.compress(body), 'gzip') if compress else (body, None)
+
+
+def test_round_trip():
+    token = issue_token('secret', 7, 3, 1)
+    claims, issued_at, answers = load_bundle('secret', *bundle(token, {'10': 'A', '11': 'C'}))
+    assert claims == {'attempt': 7, 'user': 3, 'exam': 1}
+    assert issued_at is not None
+    assert answers == {10: 'A', 11: 'C'}
+
+
+def test_uncompressed_bundle():
+    token = issue_token('secret', 7, 3, 1)
+    assert load_bundle('secret', *bundle(token, {}, compress=False))[2] == {}
+
+
+def test_wrong_key_is_a_signature_error():
+    token = issue_token('old-secret', 7, 3, 1)
+    with pytest.raises(BundleSignatureError):
+        load_bundle('secret', *bundle(token, {}))
+
+
+@pytest.mark.parametrize('body, encoding', [
+    (b'\x1f\x8b not gzip', 'gzip'),
+    (b'not json', None),
+    (json.dumps({'a': {}}).encode('utf-8'), None),
+])
+def test_malformed_bundle(body, encoding):
+    with pytest.raises(BundleError) as info:
+        load_bundle('secret', body, encoding)
+    assert not isinstance(info.value, BundleSignatureError)
+
+
+def test_decompressed_size_is_capped():
+    bomb = gzip.compress(b'{"t": "' + b'a' * (MAX_BUNDLE_BYTES * 4) + b'"}')
+    with pytest.raises(BundleError, match='too large'):
+        load_bundle('secret', bomb, 'gzip')
+
+
+@pytest.fixture
+def exam(exam_app):
+    exam_id = exam_app.db.create_exam('Bundles', 'Offline answers', 30)
+    question_id = exam_app.db.add_question(exam_id, 'Pick A', 'a', 'b', 'c', 'd', 'A')
+    return exam_id, question_id
+
+
+def open_exam(client, exam_id):
+    page = client.get(f'/exam/{exam_id}').get_data(as_text=True)
+    return re.search(r'data-bundle-token="([^"]+)"', page).group(1)
+
+
+def submit(client, token, answers):
+    body, encoding = bundle(token, answers)
+    return client.post('/submit_bundle', data=body, headers={'Content-Encoding': encoding})
+
+
+def test_submit_bundle(student, exam):
+    client, _ = student
+    exam_id, question_id = exam
+    response = submit(client, open_exam(client, exam_id), {str(question_id): 'A'})
+    assert response.status_code == 200
+    assert (response.json['score'], response.json['total_questions']) == (1, 1)
+
+
+def test_reload_does_not_extend_time_limit(exam_app, student, exam, monkeypatch):
+    client, _ = student
+    exam_id, question_id = exam
+    open_exam(client, exam_id)
+
+    late = datetime.now() + timedelta(minutes=30, seconds=exam_app.BUNDLE_GRACE_SECONDS + 60)
+    class LateDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return late
+    monkeypatch.setattr(exam_app, 'datetime', LateDatetime)
+
+    # The reload keeps the attempt but signs a fresh token
+    response = submit(client, open_exam(client, exam_id), {str(question_id): 'A'})
+    assert response.status_code == 400
+    assert 'time limit' in response.json['error']
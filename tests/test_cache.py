@@ -0,0 +1,68 @@
+# tests/test_cache.py
+from cache import ExamCache, PageCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_exam(db):
+    exam_id = db.create_exam('Python Basics', 'Test your knowledge', 30)
+    db.add_question(exam_id, 'Question 0', 'a', 'b', 'c', 'd', 'A')
+    return exam_id
+
+
+def test_exam_cache_serves_from_memory(sqlite_db, monkeypatch):
+    exam_id = make_exam(sqlite_db)
+    cache = ExamCache(sqlite_db, max_age=1.0, clock=FakeClock())
+    assert cache.exam(exam_id)['title'] == 'Python Basics'
+
+    loads = []
+    list_questions = sqlite_db.list_questions
+    monkeypatch.setattr(sqlite_db, 'list_questions', lambda *a: loads.append(1) or list_questions(*a))
+    monkeypatch.setattr(sqlite_db, 'exam_version', lambda *a: loads.append(1))
+    assert len(cache.questions(exam_id)) == 1
+    assert loads == []
+
+
+def test_exam_cache_picks_up_edits_from_another_worker(sqlite_db):
+    exam_id = make_exam(sqlite_db)
+    clock = FakeClock()
+    cache = ExamCache(sqlite_db, max_age=1.0, clock=clock)
+    [(question_id, _)] = cache.answer_key(exam_id)
+
+    # Another worker replaces the question without invalidating this cache
+    sqlite_db.delete_question(question_id)
+    new_id = sqlite_db.add_question(exam_id, 'Question 1', 'a', 'b', 'c', 'd', 'B')
+    assert [row['id'] for row in cache.answer_key(exam_id)] == [question_id]
+
+    clock.now = 1.0
+    assert [(row['id'], row['correct_answer']) for row in cache.answer_key(exam_id)] == [(new_id, 'B')]
+
+
+def test_exam_cache_drops_deleted_exam(sqlite_db):
+    exam_id = make_exam(sqlite_db)
+    clock = FakeClock()
+    cache = ExamCache(sqlite_db, max_age=1.0, clock=clock)
+    assert cache.warm(exam_id)
+
+    sqlite_db.soft_delete_exam(exam_id)
+    clock.now = 1.0
+    assert cache.exam(exam_id) is None
+    assert cache.questions(exam_id) == []
+
+
+def test_page_cache_evicts_least_recently_used():
+    cache = PageCache(max_bytes=10)
+    cache.put(('dashboard', 1), 'a', b'12345')
+    cache.put(('dashboard', 2), 'b', b'12345')
+    assert cache.get(('dashboard', 1), 'a') == b'12345'
+    cache.put(('dashboard', 3), 'c', b'12345')
+    assert cache.get(('dashboard', 2), 'b') is None
+    assert cache.get(('dashboard', 1), 'a') == b'12345'
+    assert cache.get(('dashboard', 1), 'stale') is None
+    assert cache.size == 10
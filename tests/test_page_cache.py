@@ -0,0 +1,97 @@
+# tests/test_page_cache.py
+import pytest
+
+from cache import page_cache
+
+
+@pytest.fixture
+def renders(exam_app, monkeypatch):
+    """Counts how often the dashboard and results views actually render."""
+    calls = []
+    user_results = exam_app.db.user_results
+    monkeypatch.setattr(exam_app.db, 'user_results', lambda *a: calls.append(1) or user_results(*a))
+    page_cache.clear()
+    return calls
+
+
+def exam_id(exam_app):
+    return exam_app.db.list_exams()[0]['id']
+
+
+@pytest.mark.parametrize('url', ['/dashboard', '/results'])
+def test_sends_private_etag(student, renders, url):
+    client, _ = student
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+
+@pytest.mark.parametrize('url', ['/dashboard', '/results'])
+def test_matching_etag_gets_304_without_rendering(student, renders, url):
+    client, _ = student
+    etag = client.get(url).headers['ETag']
+    assert renders == [1]
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+    assert renders == [1]
+
+
+@pytest.mark.parametrize('url', ['/dashboard', '/results'])
+def test_unchanged_page_is_reused(student, renders, url):
+    client, _ = student
+    first = client.get(url)
+    second = client.get(url)
+    assert second.get_data() == first.get_data()
+    assert renders == [1]
+
+
+def test_pending_flash_bypasses_cache(student, renders):
+    client, _ = student
+    client.get('/dashboard')
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('success', 'Exam submitted!')]
+    response = client.get('/dashboard')
+    assert b'Exam submitted!' in response.get_data()
+    assert 'ETag' not in response.headers
+    assert renders == [1, 1]
+    # Shown once, then cached again
+    assert b'Exam submitted!' not in client.get('/dashboard').get_data()
+
+
+@pytest.mark.parametrize('url', ['/dashboard', '/results'])
+def test_etag_changes_with_results(exam_app, student, renders, url):
+    client, user_id = student
+    before = client.get(url).headers['ETag']
+
+    result_id = exam_app.db.record_result(user_id, exam_id(exam_app), 4, 5)
+    recorded = client.get(url, headers={'If-None-Match': before})
+    assert recorded.status_code == 200
+    assert recorded.headers['ETag'] != before
+
+    exam_app.db.delete_result(result_id)
+    deleted = client.get(url, headers={'If-None-Match': recorded.headers['ETag']})
+    assert deleted.status_code == 200
+    assert deleted.headers['ETag'] != recorded.headers['ETag']
+
+
+def test_etag_changes_with_exam_edit(exam_app, student, renders):
+    client, _ = student
+    before = client.get('/dashboard').headers['ETag']
+    exam = exam_app.db.get_exam(exam_id(exam_app))
+    exam_app.db.update_exam(exam['id'], exam['title'], 'Edited description', exam['time_limit'])
+
+    response = client.get('/dashboard', headers={'If-None-Match': before})
+    assert response.status_code == 200
+    assert b'Edited description' in response.get_data()
+
+
+def test_etags_differ_per_user(student, exam_app):
+    client, _ = student
+    other = exam_app.app.test_client()
+    with other.session_transaction() as sess:
+        sess['user_id'] = exam_app.db.create_user('etag-other', 'hash', 'etag-other@example.com')
+    assert client.get('/dashboard').headers['ETag'] != other.get('/dashboard').headers['ETag']
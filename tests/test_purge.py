@@ -0,0 +1,62 @@
+# tests/test_purge.py
+import sqlite3
+import threading
+
+from purge import PurgeWorker
+
+
+def deleted_exam(db):
+    exam_id = db.create_exam('Python Basics', 'Test your knowledge', 30)
+    db.add_question(exam_id, 'Question 0', 'a', 'b', 'c', 'd', 'A')
+    db.soft_delete_exam(exam_id)
+    return exam_id
+
+
+def test_worker_purges_pending_jobs(sqlite_db):
+    exam_id = deleted_exam(sqlite_db)
+    worker = PurgeWorker(sqlite_db, batch_size=1, pause=0)
+    worker.purge(sqlite_db.claim_purge_job(worker.owner, worker.stale_after))
+    assert sqlite_db.list_purge_jobs()[0]['status'] == 'done'
+    assert sqlite_db.count_questions(exam_id) == 0
+
+
+def test_batch_error_leaves_job_claimed_for_retry(sqlite_db, monkeypatch):
+    deleted_exam(sqlite_db)
+    worker = PurgeWorker(sqlite_db, batch_size=1, pause=0)
+    job = sqlite_db.claim_purge_job(worker.owner, worker.stale_after)
+
+    def locked(*args):
+        raise sqlite3.OperationalError('database is locked')
+    with monkeypatch.context() as m:
+        m.setattr(sqlite_db, 'purge_batch', locked)
+        worker.purge(job)
+    assert sqlite_db.list_purge_jobs()[0]['status'] == 'running'
+
+    # Once the claim is stale the job is taken over and finished
+    retry = PurgeWorker(sqlite_db, batch_size=1, pause=0, stale_after=-1)
+    retry.purge(sqlite_db.claim_purge_job(retry.owner, retry.stale_after))
+    assert sqlite_db.list_purge_jobs()[0]['status'] == 'done'
+
+
+def test_worker_survives_claim_errors():
+    class FlakyDb:
+        def __init__(self):
+            self.calls = 0
+            self.polled_again = threading.Event()
+
+        def claim_purge_job(self, owner, stale_after):
+            self.calls += 1
+            if self.calls == 1:
+                raise sqlite3.OperationalError('database is locked')
+            self.polled_again.set()
+            return None
+
+    db = FlakyDb()
+    worker = PurgeWorker(db, poll_interval=0.01)
+    worker.start()
+    try:
+        assert db.polled_again.wait(5)
+        assert worker.is_alive()
+    finally:
+        worker.stop()
+        worker.join(5)
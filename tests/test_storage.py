@@ -0,0 +1,327 @@
+# tests/test_storage.py
+import threading
+from datetime import datetime
+
+import pytest
+
+from storage import IntegrityError, PostgresStorage, SQLiteStorage, get_storage, psycopg2
+
+
+def make_exam(db, questions=3):
+    exam_id = db.create_exam('Python Basics', 'Test your knowledge', 30)
+    for i in range(questions):
+        db.add_question(exam_id, f'Question {i}', 'a', 'b', 'c', 'd', 'ABCD'[i % 4])
+    return exam_id
+
+
+# Shared behaviour, run against every backend
+
+def test_create_and_get_user(db):
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    user = db.get_user(user_id)
+    assert user['username'] == 'alice'
+    assert user['role'] == 'student'
+    assert user[1] == 'alice'
+    assert db.get_user_by_username('alice')['id'] == user_id
+    assert db.get_user_by_username('bob') is None
+
+
+def test_duplicate_user_raises_integrity_error(db):
+    db.create_user('alice', 'hash', 'alice@example.com')
+    with pytest.raises(IntegrityError):
+        db.create_user('alice', 'hash', 'other@example.com')
+
+
+def test_users_by_role(db):
+    db.create_user('admin', 'hash', 'admin@example.com', role='admin')
+    db.create_user('alice', 'hash', 'alice@example.com')
+    db.create_user('bob', 'hash', 'bob@example.com')
+    assert [u['username'] for u in db.list_users_by_role('student')] == ['alice', 'bob']
+    assert db.count_users_by_role('admin') == 1
+
+
+def test_exams_and_questions(db):
+    exam_id = make_exam(db)
+    assert db.get_exam(exam_id)['title'] == 'Python Basics'
+    assert [e['id'] for e in db.list_exams()] == [exam_id]
+    assert db.count_exams() == 1
+
+    db.update_exam(exam_id, 'Python 101', 'Updated', 45)
+    exam = db.get_exam(exam_id)
+    assert (exam['title'], exam['time_limit']) == ('Python 101', 45)
+
+    questions = db.list_questions(exam_id)
+    assert [q['question_text'] for q in questions] == ['Question 0', 'Question 1', 'Question 2']
+    assert {row['id']: row['correct_answer'] for row in db.answer_key(exam_id)} == {
+        questions[0]['id']: 'A', questions[1]['id']: 'B', questions[2]['id']: 'C'}
+
+    db.delete_question(questions[0]['id'])
+    assert db.get_question(questions[0]['id']) is None
+    assert db.count_questions(exam_id) == 2
+    assert db.count_questions() == 2
+
+
+def test_results(db):
+    exam_id = make_exam(db)
+    alice = db.create_user('alice', 'hash', 'alice@example.com')
+    bob = db.create_user('bob', 'hash', 'bob@example.com')
+    db.record_result(alice, exam_id, 2, 3)
+    db.record_result(bob, exam_id, 3, 3)
+
+    assert [(r['title'], r['score']) for r in db.user_results(alice)] == [('Python Basics', 2)]
+    assert db.count_results() == 2
+    assert {r['username'] for r in db.all_results()} == {'alice', 'bob'}
+    assert len(db.recent_results(limit=1)) == 1
+
+
+def test_attempts(db):
+    exam_id = make_exam(db)
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    attempt_id = db.start_attempt(user_id, exam_id)
+    assert db.get_attempt(attempt_id)['submitted_at'] is None
+
+    result_id = db.record_result(user_id, exam_id, 3, 3)
+    db.finish_attempt(attempt_id, result_id)
+    attempt = db.get_attempt(attempt_id)
+    assert attempt['result_id'] == result_id
+    assert attempt['submitted_at'] is not None
+
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with db._transaction() as tx:
+            tx('rollback_user', 'INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
+               ('alice', 'hash', 'alice@example.com'))
+            raise RuntimeError('abort')
+    assert db.get_user_by_username('alice') is None
+
+
+def test_transaction_insert_returns_new_id(db):
+    with db._transaction() as tx:
+        user_id = tx('tx_user', 'INSERT INTO users (username, password, email) VALUES (?, ?, ?)',
+                     ('alice', 'hash', 'alice@example.com'), insert=True)
+    assert db.get_user(user_id)['username'] == 'alice'
+
+
+# Backend selection
+
+def test_get_storage_selects_backend(tmp_path):
+    assert isinstance(get_storage(str(tmp_path / 'a.db')), SQLiteStorage)
+    assert get_storage(f'sqlite:///{tmp_path}/b.db').path == f'{tmp_path}/b.db'
+
+
+def test_get_storage_postgres(postgres_url):
+    db = get_storage(postgres_url)
+    try:
+        assert isinstance(db, PostgresStorage)
+    finally:
+        db.close()
+
+
+# PostgreSQL statement preparation
+
+@pytest.mark.parametrize('sql, expected', [
+    ('SELECT 1', ('SELECT 1', 0)),
+    ('SELECT * FROM users WHERE id = ?', ('SELECT * FROM users WHERE id = $1', 1)),
+    ('UPDATE t SET a = ?, b = ? WHERE id = ?', ('UPDATE t SET a = $1, b = $2 WHERE id = $3', 3)),
+    ('VALUES (?,?)', ('VALUES ($1,$2)', 2)),
+])
+def test_numbered_placeholders(sql, expected):
+    assert PostgresStorage._numbered(sql) == expected
+
+
+def _prepared_statements(conn):
+    cursor = conn.cursor()
+    cursor.execute('SELECT name FROM pg_prepared_statements')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def test_statement_prepared_once_per_connection(postgres_db):
+    postgres_db.count_exams()
+    # A second PREPARE of the same name would fail on the server
+    postgres_db.count_exams()
+    with postgres_db._connection() as conn:
+        assert 'count_exams' in _prepared_statements(conn)
+        assert 'count_exams' in postgres_db._prepared[conn]
+
+
+def test_new_connection_prepares_again(postgres_db):
+    with postgres_db._connection() as first:
+        postgres_db._run(first, 'count_exams', 'SELECT COUNT(*) FROM exams', ())
+        # Another connection is a separate server session
+        with postgres_db._connection() as second:
+            assert second.get_backend_pid() != first.get_backend_pid()
+            postgres_db._run(second, 'count_exams', 'SELECT COUNT(*) FROM exams', ())
+            assert 'count_exams' in _prepared_statements(second)
+    assert all('count_exams' in postgres_db._prepared[conn] for conn in (first, second))
+
+
+def test_pool_keeps_connections_open(postgres_db):
+    with postgres_db._connection() as first, postgres_db._connection() as second:
+        pass
+    with postgres_db._connection() as again, postgres_db._connection() as other:
+        assert {again, other} == {first, second}
+    assert not first.closed and not second.closed
+
+
+def test_closed_connection_is_forgotten(postgres_db):
+    with pytest.raises(psycopg2.InterfaceError):
+        with postgres_db._connection() as conn:
+            postgres_db._run(conn, 'count_exams', 'SELECT COUNT(*) FROM exams', ())
+            assert conn in postgres_db._prepared
+            # As if the server had dropped the session
+            conn.close()
+    assert conn not in postgres_db._prepared
+    assert postgres_db.count_exams() == 0
+
+
+def test_callers_wait_for_a_free_connection(postgres_url):
+    db = PostgresStorage(postgres_url, maxconn=2)
+    errors = []
+
+    def reads():
+        for _ in range(25):
+            try:
+                db.count_exams()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=reads) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    db.close()
+    assert errors == []
+
+
+# Background purges
+
+def test_soft_delete_and_purge_exam(db):
+    exam_id = make_exam(db)
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    for _ in range(5):
+        db.record_result(user_id, exam_id, 1, 3)
+    assert db.soft_delete_exam(exam_id)
+    assert db.get_exam(exam_id) is None
+    assert db.count_results() == 0
+
+    job = db.claim_purge_job('worker-1', stale_after=60)
+    batches = []
+    done = False
+    while not done:
+        deleted, done = db.purge_batch(job, 2, 'worker-1')
+        batches.append(deleted)
+    assert max(batches) <= 2
+    assert sum(batches) == 5 + 3 + 1
+    assert db.list_purge_jobs()[0]['status'] == 'done'
+    assert db.count_questions(exam_id) == 0
+
+
+def test_running_purge_job_is_not_reclaimed(db):
+    db.soft_delete_exam(make_exam(db))
+    job = db.claim_purge_job('worker-1', stale_after=60)
+    assert job is not None
+    assert db.claim_purge_job('worker-2', stale_after=60) is None
+
+
+def test_stale_purge_job_is_taken_over(db):
+    db.soft_delete_exam(make_exam(db))
+    job = db.claim_purge_job('worker-1', stale_after=60)
+    assert db.claim_purge_job('worker-2', stale_after=-1)['id'] == job['id']
+    # The first worker has lost the job and stops without touching it
+    assert db.purge_batch(job, 2, 'worker-1') == (0, True)
+    assert db.list_purge_jobs()[0]['owner'] == 'worker-2'
+    assert db.purge_batch(job, 2, 'worker-2')[0] == 2
+
+
+# Archival
+
+def test_archive_results_batch(db):
+    exam_id = make_exam(db)
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    old, new = datetime(2020, 1, 1), datetime.now()
+    for score in (1, 2, 3):
+        db.record_result(user_id, exam_id, score, 3, date_taken=old)
+    db.record_result(user_id, exam_id, 3, 3, date_taken=new)
+
+    assert db.archive_results_batch(datetime(2021, 1, 1), 2) == 2
+    assert db.archive_results_batch(datetime(2021, 1, 1), 2) == 1
+    assert db.archive_results_batch(datetime(2021, 1, 1), 2) == 0
+
+    assert db.count_results() == 1
+    assert db.count_archived_results() == 3
+    assert len(db.all_results()) == 1
+    assert sorted(r['archived'] for r in db.all_results(include_archived=True)) == [0, 1, 1, 1]
+
+
+def test_archive_drops_rows_deleted_mid_batch(db, monkeypatch):
+    exam_id = make_exam(db)
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    first, deleted, last = [db.record_result(user_id, exam_id, 1, 3, date_taken=datetime(2020, 1, 1))
+                            for _ in range(3)]
+
+    # An admin deletes a result after it was copied but before it was summarized
+    transaction = db._transaction
+    calls = []
+    def interleaved(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            db.delete_result(deleted)
+        return transaction(*args, **kwargs)
+    monkeypatch.setattr(db, '_transaction', interleaved)
+    assert db.archive_results_batch(datetime(2021, 1, 1), 10) == 2
+    monkeypatch.undo()
+
+    assert sorted(r['id'] for r in db.all_results(include_archived=True)) == [first, last]
+    assert db.count_archived_results() == 2
+
+
+def test_hot_queries_do_not_attach_archive(sqlite_db, monkeypatch):
+    attached = []
+    connect = sqlite_db._connect
+    monkeypatch.setattr(sqlite_db, '_connect', lambda archive=False: attached.append(archive) or connect(archive))
+    sqlite_db.get_exam(1)
+    sqlite_db.all_results()
+    assert attached == [False, False]
+    sqlite_db.all_results(include_archived=True)
+    assert attached[-1] is True
+
+
+# Answer bundles
+
+def test_record_answer_bundle_is_idempotent(db):
+    exam_id = make_exam(db)
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    attempt_id = db.start_attempt(user_id, exam_id)
+    answers = [(q['id'], 'A', q['correct_answer'] == 'A') for q in db.answer_key(exam_id)]
+
+    result_id, stored = db.record_answer_bundle(attempt_id, 1, 3, answers)
+    assert stored
+    assert db.get_result(result_id)['score'] == 1
+    assert db.record_answer_bundle(attempt_id, 1, 3, answers) == (result_id, False)
+    assert db.count_results() == 1
+
+
+def test_record_answer_bundle_for_missing_attempt(db):
+    assert db.record_answer_bundle(12345, 0, 0, []) == (None, False)
+
+
+def test_purge_removes_answers_in_batches(db):
+    exam_id = make_exam(db, questions=4)
+    user_id = db.create_user('alice', 'hash', 'alice@example.com')
+    answers = [(q['id'], 'A', True) for q in db.answer_key(exam_id)]
+    for _ in range(2):
+        db.record_answer_bundle(db.start_attempt(user_id, exam_id), 4, 4, answers)
+    db.soft_delete_student(user_id)
+
+    job = db.claim_purge_job('worker-1', stale_after=60)
+    batches = []
+    done = False
+    while not done:
+        deleted, done = db.purge_batch(job, 3, 'worker-1')
+        batches.append(deleted)
+    # 8 answers, 2 attempts, 2 results and the user, never more than 3 per batch
+    assert max(batches) <= 3
+    assert sum(batches) == 8 + 2 + 2 + 1
+    assert db._scalar('count_answers', 'SELECT COUNT(*) FROM answers') == 0